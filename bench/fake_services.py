@@ -0,0 +1,258 @@
+"""
+Local stand-ins for the external services FarmHand calls, for offline
+benchmarks (see benchmark.py). Every fake takes a FaultProfile with a base
+latency, jitter and error rate, seeded so runs are reproducible.
+
+- FakeMistralClient: chat() and chat_stream() like mistralai's MistralClient
+- FakeEmbedder: Gemini embed_content, deterministic vectors per text
+- FakeCollection: a Chroma collection answering query()
+- FakeGoogleService / FakeWikipedia: the Custom Search and wikipediaapi clients
+- start_weather_server(): Open-Meteo geocoding and forecast over HTTP
+- FakeLeafModel: the image classifier, for machines without the model weights
+
+data.gov.in has its own HTTP stand-in in mock_data_gov_server.py.
+"""
+import json
+import time
+import random
+import hashlib
+import threading
+import itertools
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeServiceError(RuntimeError):
+    pass
+
+
+class FaultProfile:
+    """
+    Latency and failure behaviour of one fake service. Each call waits
+    latency +/- jitter seconds, then fails with probability error_rate.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            return self._rng.uniform(-self.jitter, self.jitter), self._rng.random()
+
+    def apply(self, name="service"):
+        offset, roll = self._draw()
+        delay = max(0.0, self.latency + offset)
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            raise FakeServiceError(f"Simulated {name} failure")
+
+
+def _stable_random(text, seed=0):
+    digest = hashlib.sha256(f"{seed}:{text}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+# --- Mistral ---
+ANSWER_WORDS = ("Apply", "neem", "oil", "spray", "early", "morning", "and", "keep", "the", "field",
+                "well", "drained", "during", "the", "monsoon", "weeks.")
+
+def _tool_call(call_id, name, arguments):
+    try:
+        from mistralai.models.chat_completion import ToolCall, FunctionCall
+        return ToolCall(id=call_id, function=FunctionCall(name=name, arguments=json.dumps(arguments)))
+    except ImportError:
+        return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+class FakeMistralClient:
+    """
+    Answers with a fixed number of tokens after a time-to-first-token delay.
+    When tools are offered and the last message is the user's question, it
+    first asks for the `tool_names` tools (one call each), so the agent loop
+    runs one tool round per turn.
+    """
+    def __init__(self, profile=None, token_latency=0.005, answer_tokens=60,
+                 tool_names=("query_knowledge_base",)):
+        self.profile = profile or FaultProfile()
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.tool_names = tuple(tool_names)
+        self._ids = itertools.count()
+
+    def _wants_tools(self, messages, tools):
+        if not tools or not self.tool_names:
+            return False
+        return _role(messages[-1]) == "user"
+
+    def _answer_tokens(self):
+        return [ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(self.answer_tokens)]
+
+    def _tool_calls(self, messages):
+        query = _content(messages[-1]) or "farming"
+        return [_tool_call(f"call_{next(self._ids)}", name, {"query": query}) for name in self.tool_names]
+
+    def chat_stream(self, model, messages, tools=None, **kwargs):
+        self.profile.apply("Mistral")
+        if self._wants_tools(messages, tools):
+            delta = SimpleNamespace(content="", tool_calls=self._tool_calls(messages))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+            return
+        for token in self._answer_tokens():
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token, tool_calls=None))])
+
+    def chat(self, model, messages, tools=None, **kwargs):
+        self.profile.apply("Mistral")
+        if self._wants_tools(messages, tools):
+            message = SimpleNamespace(content="", tool_calls=self._tool_calls(messages))
+        else:
+            time.sleep(self.token_latency * self.answer_tokens)
+            message = SimpleNamespace(content="".join(self._answer_tokens()), tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def _role(message):
+    return message.get("role") if isinstance(message, dict) else getattr(message, "role", None)
+
+def _content(message):
+    return message.get("content") if isinstance(message, dict) else getattr(message, "content", None)
+
+# --- Embeddings and vector store ---
+class FakeEmbedder:
+    """
+    Stand-in for genai.embed_content: returns a deterministic vector per
+    text, so the same question always embeds the same way.
+    """
+    def __init__(self, profile=None, dimensions=768):
+        self.profile = profile or FaultProfile()
+        self.dimensions = dimensions
+
+    def __call__(self, text):
+        self.profile.apply("embedding")
+        rng = _stable_random(text)
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.dimensions)]
+
+
+class FakeCollection:
+    """
+    Chroma collection stand-in; query() returns n_results documents chosen
+    deterministically from the embedding.
+    """
+    def __init__(self, documents, profile=None):
+        self.documents = list(documents)
+        self.profile = profile or FaultProfile()
+
+    def query(self, query_embeddings, n_results=2, **kwargs):
+        self.profile.apply("Chroma")
+        results = []
+        for embedding in query_embeddings:
+            start = int(abs(embedding[0]) * 1000) % len(self.documents)
+            results.append([self.documents[(start + i) % len(self.documents)] for i in range(n_results)])
+        return {"documents": results}
+
+# --- Web search ---
+class FakeGoogleService:
+    """
+    Mimics googleapiclient's service.cse().list(q=..., cx=..., num=...).execute().
+    """
+    def __init__(self, profile=None):
+        self.profile = profile or FaultProfile()
+
+    def cse(self):
+        return self
+
+    def list(self, q, cx=None, num=3, **kwargs):
+        return SimpleNamespace(execute=lambda: self._execute(q, num))
+
+    def _execute(self, query, num):
+        self.profile.apply("Google Custom Search")
+        return {"items": [
+            {"title": f"Result {i + 1} for {query}", "snippet": f"Market update {i + 1}: prices steady at Rs. {2400 + 50 * i}/quintal."}
+            for i in range(num)
+        ]}
+
+
+class FakeWikipedia:
+    """
+    Mimics wikipediaapi.Wikipedia(...).page(title).
+    """
+    def __init__(self, profile=None):
+        self.profile = profile or FaultProfile()
+
+    def page(self, title):
+        self.profile.apply("Wikipedia")
+        summary = (f"{title} is a crop widely grown in Kerala. It prefers humid tropical climates. "
+                   f"It is propagated from cuttings or seed. Yields depend on monsoon rainfall.")
+        return SimpleNamespace(exists=lambda: True, summary=summary)
+
+# --- Weather ---
+def make_weather_handler(latency=0.0, error_rate=0.0, seed=0):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            with rng_lock:
+                failed = rng.random() < error_rate
+            if failed:
+                self.send_error(503, "Simulated upstream failure")
+                return
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path.endswith("/search"):
+                name = query.get("name", ["Kochi"])[0]
+                payload = {"results": [{"name": name, "latitude": 9.93, "longitude": 76.26}]}
+            else:
+                days = int(query.get("forecast_days", ["4"])[0])
+                payload = {"daily": {
+                    "time": [f"2025-06-{d + 1:02d}" for d in range(days)],
+                    "temperature_2m_min": [24.0 + d * 0.1 for d in range(days)],
+                    "temperature_2m_max": [31.0 + d * 0.2 for d in range(days)],
+                    "precipitation_sum": [12.5 - d for d in range(days)],
+                }}
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_weather_server(port=0, latency=0.0, error_rate=0.0, seed=0):
+    """
+    Starts an Open-Meteo stand-in on a background thread.
+    Returns (server, geocoding_url, forecast_url); call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_weather_handler(latency, error_rate, seed))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, f"{base}/v1/search", f"{base}/v1/forecast"
+
+# --- Image classifier ---
+class FakeLeafModel:
+    """
+    Stand-in for the ViT classifier: waits profile latency per batch and
+    returns random numpy logits, like the ONNX classifier, so it runs
+    without torch.
+    """
+    framework = "np"
+
+    def __init__(self, profile=None, labels=("Healthy", "Rice Blast", "Rice Brown Spot", "Rice Sheath Blight"), seed=0):
+        self.profile = profile or FaultProfile()
+        self.config = SimpleNamespace(id2label=dict(enumerate(labels)))
+        self._rng = random.Random(seed)
+
+    def __call__(self, pixel_values=None, **kwargs):
+        self.profile.apply("classifier")
+        return SimpleNamespace(logits=[[self._rng.gauss(0.0, 1.0) for _ in self.config.id2label]
+                                       for _ in range(len(pixel_values))])
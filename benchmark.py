@@ -0,0 +1,335 @@
+# Offline latency/throughput benchmark for FarmHand's hot paths.
+#
+# Every external service is replaced by a local fake with configurable latency
+# and error rate (bench/fake_services.py, pages/mock_data_gov_server.py), and
+# all caches live in a fresh temporary directory, so two runs on the same
+# machine are comparable:
+#
+#   python benchmark.py --output bench/results/base.json
+#   python benchmark.py --output bench/results/new.json --compare bench/results/base.json
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import datetime
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, "pages"))
+sys.path.append(os.path.join(BASE_DIR, "todo"))
+sys.path.append(os.path.join(BASE_DIR, "bench"))
+
+SCENARIOS = ["agent_respond", "query_knowledge_base", "get_all_market_prices",
+             "analyze_image_with_model", "get_daily_todo_list"]
+
+# Seconds per call at --latency-scale 1.0, roughly what production sees.
+SERVICE_LATENCY = {
+    "mistral": 0.40,          # time to first token
+    "mistral_token": 0.004,   # per streamed token
+    "embedding": 0.08,
+    "chroma": 0.01,
+    "google": 0.25,
+    "wikipedia": 0.20,
+    "data_gov": 0.15,
+    "weather": 0.12,
+    "classifier": 0.06,       # per batch
+}
+
+KERALA_MARKETS = ["Thiruvananthapuram", "Kochi", "Kozhikode", "Thrissur", "Palakkad"]
+QUESTIONS = [
+    "How do I prepare my paddy field for the Mundakan season?",
+    "What is the best fertilizer schedule for banana?",
+    "How can I control pepper quick wilt?",
+    "When should coconut seedlings be transplanted?",
+]
+
+
+def setup_environment(args, workdir):
+    """
+    Points every cache at workdir and starts the HTTP stand-ins. Must run
+    before any page module is imported, since their paths are read at import.
+    Returns the servers to shut down afterwards.
+    """
+    from mock_data_gov_server import start_server
+    from fake_services import start_weather_server
+
+    scale = args.latency_scale
+    data_gov, data_gov_url = start_server(latency=SERVICE_LATENCY["data_gov"] * scale, error_rate=args.error_rate)
+    weather, geocoding_url, forecast_url = start_weather_server(
+        latency=SERVICE_LATENCY["weather"] * scale, error_rate=args.error_rate, seed=args.seed)
+
+    os.environ.update({
+        "API_CACHE_PATH": os.path.join(workdir, "api_cache.sqlite3"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "query_embeddings.sqlite3"),
+        "RESULT_CACHE_PATH": os.path.join(workdir, "leaf_results.sqlite3"),
+        "LOCAL_INDEX_PATH": os.path.join(workdir, "local_index.json"),
+        "TRACE_PATH": args.trace or "",
+        "DATA_GOV_API_URL": data_gov_url,
+        "DATA_GOV_API_KEY": "benchmark",
+        "OPEN_METEO_GEOCODING_URL": geocoding_url,
+        "OPEN_METEO_FORECAST_URL": forecast_url,
+        "KNOWLEDGE_BACKEND": "chroma",
+        "MISTRAL_API_KEY": "benchmark",
+    })
+    return [data_gov, weather]
+
+def install_fakes(args):
+    """
+    Swaps the client factories of the page modules for the fakes.
+    Returns the fake Mistral client.
+    """
+    import unified_tools
+    import embedding_cache
+    import api_cache
+    import result_cache
+    import marketbest
+    import todo_chatbot
+    from fake_services import (FaultProfile, FakeMistralClient, FakeEmbedder, FakeCollection,
+                               FakeGoogleService, FakeWikipedia)
+
+    scale, error_rate, seed = args.latency_scale, args.error_rate, args.seed
+    def profile(service, offset):
+        return FaultProfile(SERVICE_LATENCY[service] * scale, SERVICE_LATENCY[service] * scale * 0.2,
+                            error_rate, seed=seed + offset)
+
+    collection = FakeCollection(_knowledge_documents(), profile("chroma", 1))
+    google, wikipedia = FakeGoogleService(profile("google", 2)), FakeWikipedia(profile("wikipedia", 3))
+    unified_tools.get_knowledge_base = lambda: collection
+    unified_tools._remote_embed = FakeEmbedder(profile("embedding", 4))
+    unified_tools._google_service = lambda: google
+    unified_tools._wikipedia_client = lambda: wikipedia
+
+    mistral = FakeMistralClient(profile("mistral", 5), token_latency=SERVICE_LATENCY["mistral_token"] * scale,
+                                answer_tokens=args.answer_tokens)
+    todo_chatbot._client = mistral
+
+    if args.cache == "cold":
+        # Every request pays for the upstream call: nothing is kept or reused.
+        unified_tools.TOOL_CACHE_TTLS = {tool: (0, 0) for tool in unified_tools.TOOL_CACHE_TTLS}
+        marketbest.PRICE_TTL = marketbest.PRICE_STALE_TTL = 0
+        embedding_cache._default_cache = embedding_cache.EmbeddingCache(max_entries=0)
+        result_cache._default_cache = result_cache.ResultCache(max_entries=0)
+    api_cache.get_cache()
+    return mistral
+
+def _knowledge_documents():
+    import local_retrieval
+    try:
+        documents = [chunk for text in local_retrieval.read_documents().values()
+                     for chunk in local_retrieval.chunk_text(text)]
+    except Exception:
+        documents = []
+    return documents or [f"Kerala farming note {i}: keep fields drained during the monsoon." for i in range(50)]
+
+def _leaf_image_bytes(index, size=(640, 480)):
+    import io
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(index)
+    pixels = rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def build_scenarios(args, mistral):
+    """
+    Returns {name: call(i)} for the requested scenarios. In cold mode each
+    request uses distinct inputs; in warm mode requests repeat the same one.
+    """
+    vary = args.cache == "cold"
+    def question(i):
+        text = QUESTIONS[i % len(QUESTIONS)]
+        return f"{text} (request {i})" if vary else text
+
+    scenarios = {}
+    if "agent_respond" in args.scenarios:
+        import mistral_chatbot
+        from mistralai.models.chat_completion import ChatMessage
+        def agent(i):
+            messages = [ChatMessage(role="system", content="You are an expert agricultural assistant for farmers in Kerala.")]
+            return mistral_chatbot.agent_respond(mistral, "mistral-small-latest", question(i), messages)
+        scenarios["agent_respond"] = agent
+
+    if "query_knowledge_base" in args.scenarios:
+        from unified_tools import query_knowledge_base
+        scenarios["query_knowledge_base"] = lambda i: query_knowledge_base(question(i))
+
+    if "get_all_market_prices" in args.scenarios:
+        from marketbest import get_all_market_prices
+        market_crops = ["Banana", "Onion", "Ashgourd", "Bhindi(Ladies Finger)"]
+        scenarios["get_all_market_prices"] = lambda i: get_all_market_prices(market_crops[i % len(market_crops)],
+                                                                             KERALA_MARKETS)
+
+    if "analyze_image_with_model" in args.scenarios:
+        from disease_analyzer import analyze_image_with_model
+        from image_preprocessing import LeafPreprocessor
+        from fake_services import FaultProfile, FakeLeafModel
+        processor = LeafPreprocessor.from_config_file()
+        latency = SERVICE_LATENCY["classifier"] * args.latency_scale
+        model = FakeLeafModel(FaultProfile(latency, latency * 0.2, 0.0, seed=args.seed + 6))
+        # Encoded up front so JPEG encoding is not part of the measured latency.
+        images = [_leaf_image_bytes(i) for i in range(args.requests if vary else 1)]
+        def analyze(i):
+            return analyze_image_with_model(None, processor, model, image_bytes=images[i % len(images)])
+        scenarios["analyze_image_with_model"] = analyze
+
+    if "get_daily_todo_list" in args.scenarios:
+        from todo_chatbot import get_daily_todo_list
+        locations = ["Thiruvananthapuram", "Kochi", "Thrissur"]
+        todo_crops = ["coconut", "banana", "pepper", "rubber"]
+        def todo(i):
+            if not vary:
+                return get_daily_todo_list(locations[0], todo_crops[0])
+            return get_daily_todo_list(locations[i % len(locations)], todo_crops[i % len(todo_crops)])
+        scenarios["get_daily_todo_list"] = todo
+    return scenarios
+
+# --- Measurement ---
+def _failed(result):
+    if result is None:
+        return True
+    if isinstance(result, dict):
+        return "error" in result
+    return isinstance(result, str) and result.startswith("(Error")
+
+def run_scenario(call, requests, concurrency, warmup):
+    """
+    Issues `requests` calls from `concurrency` threads and returns latency
+    percentiles, throughput and the error count.
+    """
+    for i in range(warmup):
+        call(i)
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            failed = _failed(call(i))
+        except Exception:
+            failed = True
+        return (time.perf_counter() - start) * 1000, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    from tracing import percentile
+    latencies = sorted(latency for latency, _ in outcomes)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(failed for _, failed in outcomes),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2),
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2),
+        },
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+# --- Comparison ---
+def compare(current, baseline_path, threshold):
+    """
+    Prints p50/p95/throughput changes against an earlier run. Returns the
+    list of (scenario, concurrency) rows whose p95 got worse by more than
+    `threshold` (a fraction).
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\n{'scenario':<28}{'conc':>6}{'p50 ms':>18}{'p95 ms':>18}{'req/s':>16}")
+    for row in current["results"]:
+        old = baseline.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        def change(new, before):
+            return f"{new:.1f} ({(new - before) / before * 100:+.0f}%)" if before else f"{new:.1f}"
+        print(f"{row['scenario']:<28}{row['concurrency']:>6}"
+              f"{change(row['latency_ms']['p50'], old['latency_ms']['p50']):>18}"
+              f"{change(row['latency_ms']['p95'], old['latency_ms']['p95']):>18}"
+              f"{change(row['throughput_rps'], old['throughput_rps']):>16}")
+        if old["latency_ms"]["p95"] and row["latency_ms"]["p95"] > old["latency_ms"]["p95"] * (1 + threshold):
+            regressions.append((row["scenario"], row["concurrency"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FarmHand's hot paths against local fakes.")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=40, help="Requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold",
+                        help="cold: distinct inputs and no reuse of cached results; warm: repeated inputs")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for all fake service latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Failure probability of every fake service")
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace", default=None, help="Also write spans to this JSONL file")
+    parser.add_argument("--output", default=None, help="Results JSON (default bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--fail-on-regression", type=float, default=None, metavar="FRACTION",
+                        help="Exit 1 if any p95 is worse than the --compare run by more than this fraction")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    workdir = tempfile.mkdtemp(prefix="farmhand-bench-")
+    servers = setup_environment(args, workdir)
+    try:
+        mistral = install_fakes(args)
+        scenarios = build_scenarios(args, mistral)
+        results = []
+        for name, call in scenarios.items():
+            for concurrency in args.concurrency:
+                row = {"scenario": name, **run_scenario(call, args.requests, concurrency, args.warmup)}
+                results.append(row)
+                latency = row["latency_ms"]
+                print(f"{name:<28} x{concurrency:<3} {row['throughput_rps']:>8.2f} req/s  "
+                      f"p50 {latency['p50']:>8.1f}  p95 {latency['p95']:>8.1f}  p99 {latency['p99']:>8.1f} ms  "
+                      f"errors {row['errors']}")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "trace")},
+            "service_latency_s": SERVICE_LATENCY,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(BASE_DIR, "bench", "results", f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        regressions = compare(report, args.compare, args.fail_on_regression or 0.0)
+        if args.fail_on_regression is not None and regressions:
+            print(f"p95 regressions: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
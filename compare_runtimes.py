@@ -0,0 +1,103 @@
+# Compares accuracy and CPU latency of the PyTorch, ONNX fp32 and ONNX int8 leaf disease models
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import torch
+from PIL import Image
+from transformers import AutoImageProcessor, AutoModelForImageClassification
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages"))
+from onnx_classifier import load_onnx_classifier, ONNX_MODEL_DIR, ONNX_FILES
+
+MODEL_NAME = "wambugu71/crop_leaf_diseases_vit"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def load_images(image_dir):
+    """
+    Loads every image under image_dir. If images sit in sub-folders named after
+    a model label (e.g. Rice___Leaf_Blast/), that folder name is the true label.
+    Returns (images, labels) where a label is None when unknown.
+    """
+    images, labels = [], []
+    for root, _, files in os.walk(image_dir):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(Image.open(os.path.join(root, name)).convert("RGB"))
+                folder = os.path.basename(root)
+                labels.append(folder if os.path.abspath(root) != os.path.abspath(image_dir) else None)
+    return images, labels
+
+def run_model(model, pixel_values, batch_size, warmup=2):
+    """
+    Returns (predicted indices, per-batch latencies in ms).
+    """
+    for _ in range(warmup):
+        with torch.no_grad():
+            model(pixel_values=pixel_values[:batch_size])
+
+    predictions, latencies = [], []
+    for start in range(0, len(pixel_values), batch_size):
+        batch = pixel_values[start:start + batch_size]
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            logits = model(pixel_values=batch).logits
+        latencies.append((time.perf_counter() - t0) * 1000)
+        predictions.extend(logits.argmax(-1).tolist())
+    return np.array(predictions), np.array(latencies)
+
+def summarize(name, predictions, latencies, reference, labels, id2label, batch_size, n_images, size_mb):
+    summary = {
+        "runtime": name,
+        "model_size_mb": round(size_mb, 1) if size_mb else None,
+        "batch_size": batch_size,
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+        "images_per_second": round(n_images / (latencies.sum() / 1000), 1),
+        "agreement_with_pytorch": round(float((predictions == reference).mean()), 4),
+    }
+    known = [i for i, label in enumerate(labels) if label is not None]
+    if known:
+        correct = sum(id2label[int(predictions[i])] == labels[i] for i in known)
+        summary["accuracy"] = round(correct / len(known), 4)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare PyTorch vs ONNX (fp32/int8) leaf disease runtimes.")
+    parser.add_argument("image_dir", help="Folder of leaf images (optionally in per-label sub-folders)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for every runtime")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    images, labels = load_images(args.image_dir)
+    if not images:
+        sys.exit(f"No images found in {args.image_dir}")
+    processor = AutoImageProcessor.from_pretrained(MODEL_NAME)
+    pixel_values = processor(images=images, return_tensors="pt")["pixel_values"]
+
+    pytorch_model = AutoModelForImageClassification.from_pretrained(MODEL_NAME)
+    id2label = pytorch_model.config.id2label
+    reference, latencies = run_model(pytorch_model, pixel_values, args.batch_size)
+    results = [summarize("pytorch", reference, latencies, reference, labels, id2label,
+                         args.batch_size, len(images), None)]
+
+    for runtime, filename in ONNX_FILES.items():
+        model = load_onnx_classifier(runtime, num_threads=args.threads)
+        predictions, latencies = run_model(model, pixel_values, args.batch_size)
+        size_mb = os.path.getsize(os.path.join(ONNX_MODEL_DIR, filename)) / 1e6
+        results.append(summarize(runtime, predictions, latencies, reference, labels, id2label,
+                                 args.batch_size, len(images), size_mb))
+
+    for row in results:
+        print(json.dumps(row))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
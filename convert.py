@@ -1,21 +1,63 @@
-# Python script to convert a Hugging Face model to TFLite
+# Python script to export the Hugging Face leaf disease ViT to ONNX with int8 dynamic quantization
+import os
+import argparse
+import torch
 from transformers import ViTForImageClassification, ViTImageProcessor
-import tensorflow as tf
-from PIL import Image
-import numpy as np
+from onnxruntime.quantization import quantize_dynamic, QuantType
 
-# Load the model and processor from Hugging Face
-model_name = "wambugu71/crop_leaf_diseases_vit"
-processor = ViTImageProcessor.from_pretrained(model_name)
-model = ViTForImageClassification.from_pretrained(model_name)
+# --- Export Settings ---
+MODEL_NAME = "wambugu71/crop_leaf_diseases_vit"
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx_model")
+FP32_FILE = "crop_disease_model.onnx"
+INT8_FILE = "crop_disease_model.int8.onnx"
 
-# Create a dummy input to trace the model
-dummy_input = tf.convert_to_tensor(np.zeros((1, 224, 224, 3), dtype=np.float32))
 
-# Convert the model to TFLite
-converter = tf.lite.TFLiteConverter.from_keras_model(model)
-tflite_model = converter.convert()
+def export_fp32(model_name, output_path):
+    """
+    Traces the PyTorch model into an ONNX graph with a dynamic batch dimension.
+    """
+    model = ViTForImageClassification.from_pretrained(model_name)
+    model.eval()
+    size = model.config.image_size
 
-# Save the TFLite model
-with open('crop_disease_model.tflite', 'wb') as f:
-    f.write(tflite_model)
\ No newline at end of file
+    # Create a dummy input to trace the model (NCHW, as the ViT processor produces)
+    dummy_input = torch.zeros((1, model.config.num_channels, size, size), dtype=torch.float32)
+    torch.onnx.export(
+        model,
+        (dummy_input,),
+        output_path,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+        do_constant_folding=True,
+    )
+    return model
+
+def quantize_int8(fp32_path, int8_path):
+    """
+    Dynamic int8 quantization: weights of the MatMul/Gemm layers are stored as
+    int8 and activations are quantized on the fly, no calibration data needed.
+    """
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul", "Gemm"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the leaf disease ViT to ONNX (fp32 + int8).")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--output-dir", default=EXPORT_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    fp32_path = os.path.join(args.output_dir, FP32_FILE)
+    int8_path = os.path.join(args.output_dir, INT8_FILE)
+
+    model = export_fp32(args.model, fp32_path)
+    quantize_int8(fp32_path, int8_path)
+
+    # Keep the processor and label config next to the graphs so the app can run without the Hub
+    model.config.save_pretrained(args.output_dir)
+    ViTImageProcessor.from_pretrained(args.model).save_pretrained(args.output_dir)
+
+    for path in (fp32_path, int8_path):
+        print(f"Saved {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
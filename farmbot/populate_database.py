@@ -1,48 +1,125 @@
 import os
+import sys
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import chromadb
 import google.generativeai as genai
 from dotenv import load_dotenv
 
-print("Starting the process to build the knowledge base...")
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages"))
+from local_retrieval import chunk_text
+
+# --- SETTINGS ---
+DOCUMENTS_PATH = "knowledge_documents"
+DATABASE_PATH = "agri_db"
+COLLECTION_NAME = "kerala_agri_knowledge"
+EMBEDDING_MODEL = "models/embedding-001"
+MAX_BATCH_ITEMS = 100       # chunks per embed_content call
+MAX_BATCH_CHARS = 100_000   # keeps each request well under the payload limit
+MAX_CONCURRENCY = 4         # embed_content calls in flight
+MAX_RETRIES = 3
 
-# --- SETUP ---
-load_dotenv()
-try:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found in .env file")
-    genai.configure(api_key=api_key)
-except Exception as e:
-    print(f"Error configuring API: {e}")
-    exit()
 
 # --- DATA PREPARATION ---
-DOCUMENTS_PATH = "knowledge_documents"
-documents = []
-for filename in os.listdir(DOCUMENTS_PATH):
-    if filename.endswith(".txt"):
-        filepath = os.path.join(DOCUMENTS_PATH, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            documents.append(f.read())
-print(f"Found and read {len(documents)} documents.")
-
-# --- DATABASE SETUP ---
-client = chromadb.PersistentClient(path="agri_db")
-collection_name = "kerala_agri_knowledge"
-collection = client.get_or_create_collection(name=collection_name)
-print(f"ChromaDB collection '{collection_name}' is ready.")
+def chunk_id(source, text):
+    """
+    Content-addressed id: an unchanged chunk keeps its id across runs, an edited one gets a new id.
+    """
+    return f"{source}:{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+def load_chunks(path=DOCUMENTS_PATH):
+    """
+    Returns {id: (text, metadata)} for every overlapping chunk of every .txt document.
+    """
+    chunks = {}
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".txt"):
+            filepath = os.path.join(path, filename)
+            with open(filepath, 'r', encoding='utf-8') as f:
+                text = f.read()
+            for position, chunk in enumerate(chunk_text(text)):
+                chunks[chunk_id(filename, chunk)] = (chunk, {"source": filename, "position": position})
+    return chunks
+
+def make_batches(ids, chunks):
+    """
+    Groups ids into batches bounded by both item count and total characters.
+    """
+    batch, size = [], 0
+    for cid in ids:
+        length = len(chunks[cid][0])
+        if batch and (len(batch) >= MAX_BATCH_ITEMS or size + length > MAX_BATCH_CHARS):
+            yield batch
+            batch, size = [], 0
+        batch.append(cid)
+        size += length
+    if batch:
+        yield batch
 
 # --- EMBEDDING AND STORING ---
-print("Embedding documents and storing them in the database...")
-result = genai.embed_content(
-    model="models/embedding-001",
-    content=documents,
-    task_type="retrieval_document"
-)
-collection.add(
-    embeddings=result['embedding'],
-    documents=documents,
-    ids=[f"doc_{i}" for i in range(len(documents))]
-)
-
-print(f"\nSuccessfully built the database. The 'agri_db' folder is now ready.")
\ No newline at end of file
+def embed_batch(texts):
+    for attempt in range(MAX_RETRIES):
+        try:
+            result = genai.embed_content(model=EMBEDDING_MODEL, content=texts, task_type="retrieval_document")
+            return result['embedding']
+        except Exception:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+def sync_collection(collection, chunks):
+    """
+    Embeds only chunks whose id is not yet stored, upserts them batch by batch,
+    and deletes ids that no longer match any current chunk.
+    """
+    existing = set(collection.get(include=[])['ids'])
+    new_ids = [cid for cid in chunks if cid not in existing]
+    stale_ids = sorted(existing - set(chunks))
+    print(f"{len(chunks)} chunks: {len(new_ids)} new or changed, "
+          f"{len(existing) - len(stale_ids)} unchanged, {len(stale_ids)} stale.")
+
+    batches = list(make_batches(new_ids, chunks))
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        futures = {executor.submit(embed_batch, [chunks[cid][0] for cid in batch]): batch for batch in batches}
+        for done, future in enumerate(as_completed(futures), start=1):
+            batch = futures[future]
+            collection.upsert(
+                ids=batch,
+                embeddings=future.result(),
+                documents=[chunks[cid][0] for cid in batch],
+                metadatas=[chunks[cid][1] for cid in batch],
+            )
+            print(f"  Stored batch {done}/{len(batches)} ({len(batch)} chunks)")
+
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        print(f"  Deleted {len(stale_ids)} stale chunks")
+
+
+if __name__ == "__main__":
+    print("Starting the process to build the knowledge base...")
+
+    # --- SETUP ---
+    load_dotenv()
+    try:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in .env file")
+        genai.configure(api_key=api_key)
+    except Exception as e:
+        print(f"Error configuring API: {e}")
+        exit()
+
+    chunks = load_chunks()
+    print(f"Split the documents into {len(chunks)} chunks.")
+
+    # --- DATABASE SETUP ---
+    client = chromadb.PersistentClient(path=DATABASE_PATH)
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    print(f"ChromaDB collection '{COLLECTION_NAME}' is ready.")
+
+    print("Embedding new chunks and syncing the database...")
+    sync_collection(collection, chunks)
+
+    print(f"\nSuccessfully synced the database. The '{DATABASE_PATH}' folder is now ready.")
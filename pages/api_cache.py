@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+# --- Cache Location ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.getenv("API_CACHE_PATH", os.path.join(BASE_DIR, "cache", "api_cache.sqlite3"))
+REFRESH_LEASE = 30  # seconds one process may hold a background refresh
+NEGATIVE_TTL = 5 * 60  # "no data" answers are reused for this long before asking again
+PURGE_INTERVAL = 60 * 60  # seconds between purges of expired rows, per namespace and process
+EMPTY_VALUES = ("null", "[]", "{}", '""')  # JSON of results that carry no data
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    value TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    refresh_until REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_grp ON cache (namespace, grp, fetched_at);
+"""
+
+class PersistentCache:
+    """
+    Stale-while-revalidate cache in SQLite, shared by every Streamlit worker
+    process on the machine. Values are stored as JSON.
+
+    - fresh (age < ttl): returned directly
+    - stale (ttl <= age < stale_ttl): returned immediately, refreshed in the background
+    - missing or too old: fetched synchronously; if that fails, the newest
+      entry of the same group (e.g. yesterday's price) is served instead
+
+    Concurrent synchronous fetches of the same key within a process are
+    coalesced: one thread calls fetch(), the others wait for its result.
+
+    A fetch that succeeds without data (None or an empty list/dict) is cached
+    as a negative result for negative_ttl, so missing keys are not re-fetched
+    on every call. Rows older than a namespace's stale_ttl are purged
+    periodically, so the date-keyed entries do not accumulate forever.
+    """
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._refreshing = set()
+        self._inflight = {}
+        self._last_purge = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared across threads, so keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Raw access ---
+    def get(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT value, fetched_at FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def get_latest_in_group(self, namespace, group):
+        # Negative results are skipped: they are no use as a fallback.
+        row = self._conn().execute(
+            "SELECT value, fetched_at FROM cache WHERE namespace = ? AND grp = ? "
+            f"AND value NOT IN ({', '.join('?' * len(EMPTY_VALUES))}) ORDER BY fetched_at DESC LIMIT 1",
+            (namespace, group, *EMPTY_VALUES),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, namespace, key, value, group=None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, grp, value, fetched_at, refresh_until) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            (namespace, key, group or key, json.dumps(value), time.time()),
+        )
+
+    def purge(self, older_than, namespace=None):
+        """
+        Deletes entries (of one namespace, or all) fetched more than
+        `older_than` seconds ago.
+        """
+        cutoff = time.time() - older_than
+        if namespace is None:
+            self._conn().execute("DELETE FROM cache WHERE fetched_at < ?", (cutoff,))
+        else:
+            self._conn().execute("DELETE FROM cache WHERE namespace = ? AND fetched_at < ?", (namespace, cutoff))
+
+    def _maybe_purge(self, namespace, older_than):
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge.get(namespace, 0) < PURGE_INTERVAL:
+                return
+            self._last_purge[namespace] = now
+        try:
+            self.purge(older_than, namespace)
+        except sqlite3.OperationalError:
+            pass  # another process holds the write lock; try again next interval
+
+    # --- Stale-while-revalidate ---
+    def _claim_refresh(self, namespace, key):
+        """
+        Takes a short lease in the database so only one process refreshes a key.
+        """
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE cache SET refresh_until = ? WHERE namespace = ? AND key = ? AND refresh_until < ?",
+            (now + REFRESH_LEASE, namespace, key, now),
+        )
+        return cur.rowcount == 1
+
+    def _refresh_in_background(self, namespace, key, fetch, group):
+        token = (namespace, key)
+        with self._lock:
+            if token in self._refreshing:
+                return
+            self._refreshing.add(token)
+
+        def run():
+            try:
+                if self._claim_refresh(namespace, key):
+                    value = fetch()
+                    if not _is_empty(value):  # keep serving the stale data over an empty answer
+                        self.set(namespace, key, value, group)
+            except Exception:
+                pass  # keep serving the stale value; the lease expires on its own
+            finally:
+                with self._lock:
+                    self._refreshing.discard(token)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _fetch_coalesced(self, namespace, key, fetch, group):
+        token = (namespace, key)
+        with self._lock:
+            future = self._inflight.get(token)
+            owner = future is None
+            if owner:
+                future = self._inflight[token] = Future()
+        if not owner:
+            return future.result()
+
+        value = None
+        try:
+            value = fetch()
+            self.set(namespace, key, value, group)
+        except Exception:
+            value = None
+        finally:
+            with self._lock:
+                self._inflight.pop(token, None)
+            future.set_result(value)
+        return value
+
+    def get_or_fetch(self, namespace, key, fetch, ttl, stale_ttl, group=None, negative_ttl=NEGATIVE_TTL):
+        """
+        Returns the cached value for key, calling fetch() as described in the
+        class docstring. fetch() should raise on failure and return None (or
+        an empty list/dict) when there is no data.
+        Without data, the newest non-empty entry of the group is served;
+        otherwise the empty result (None if the fetch failed) is returned.
+        """
+        self._maybe_purge(namespace, max(stale_ttl, negative_ttl))
+        cached = self.get(namespace, key)
+        if cached is not None:
+            value, fetched_at = cached
+            age = time.time() - fetched_at
+            if _is_empty(value):
+                if age < negative_ttl:
+                    return self._fallback(namespace, group or key, value)
+            elif age < ttl:
+                return value
+            elif age < stale_ttl:
+                self._refresh_in_background(namespace, key, fetch, group)
+                return value
+
+        value = self._fetch_coalesced(namespace, key, fetch, group)
+        if not _is_empty(value):
+            return value
+        if cached is not None and not _is_empty(cached[0]):
+            return cached[0]
+        return self._fallback(namespace, group or key, value)
+
+    def _fallback(self, namespace, group, value):
+        latest = self.get_latest_in_group(namespace, group)
+        return latest[0] if latest else value
+
+
+def _is_empty(value):
+    return value is None or value == [] or value == {} or value == ""
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_cache():
+    """
+    Returns the process-wide cache instance.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PersistentCache()
+        return _default_cache
@@ -0,0 +1,152 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+import price_store
+
+# --- Board Location ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOARD_PATH = os.getenv("FORECAST_BOARD_PATH", os.path.join(BASE_DIR, "forecast_board.parquet"))
+
+SERIES_COLS = ["State", "Commodity", "Market"]
+HORIZON = 7
+Z_95 = 1.96
+# Smoothing parameters are picked per series from this grid, all series at once.
+ALPHA_GRID = (0.2, 0.4, 0.6, 0.8)
+BETA_GRID = (0.05, 0.1, 0.2)
+
+# --- Aligning Series ---
+def aligned_matrix(df):
+    """
+    Pivots long price rows into a (series x days) matrix on a shared daily
+    calendar. Days without arrivals carry the last price forward; days before
+    a series' first arrival stay NaN.
+    Returns (values, series_index, dates).
+    """
+    df = df.reset_index()
+    wide = df.pivot_table(index=SERIES_COLS, columns="Arrival_Date",
+                          values="Modal_Price", aggfunc="mean", observed=True)
+    dates = pd.date_range(wide.columns.min(), wide.columns.max(), freq="D")
+    wide = wide.reindex(columns=dates).ffill(axis=1)
+    return wide.to_numpy(dtype=np.float64), wide.index, dates
+
+# --- Vectorized Holt Smoothing ---
+def holt_filter(values, alpha, beta):
+    """
+    Runs Holt's linear trend smoothing over every row of `values` in one pass.
+    `alpha` and `beta` are scalars or per-row arrays. The loop is over days
+    only; each step updates all series with a handful of array operations.
+    Returns (level, trend, sse, n_errors) per row.
+    """
+    n_series, n_days = values.shape
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), (n_series,))
+    beta = np.broadcast_to(np.asarray(beta, dtype=np.float64), (n_series,))
+
+    level = np.full(n_series, np.nan)
+    trend = np.zeros(n_series)
+    sse = np.zeros(n_series)
+    n_errors = np.zeros(n_series)
+
+    for t in range(n_days):
+        y = values[:, t]
+        observed = ~np.isnan(y)
+        started = observed & ~np.isnan(level)
+
+        # One-step-ahead errors for series that already have a level.
+        error = np.where(started, y - (level + trend), 0.0)
+        sse += error * error
+        n_errors += started
+
+        new_level = alpha * y + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        level = np.where(started, new_level, level)
+        trend = np.where(started, new_trend, trend)
+
+        # Series whose first observation is today start with a flat trend.
+        first = observed & np.isnan(level)
+        level = np.where(first, y, level)
+
+    return level, trend, sse, n_errors
+
+def fit_parameters(values, alpha_grid=ALPHA_GRID, beta_grid=BETA_GRID):
+    """
+    Picks the (alpha, beta) with the lowest one-step SSE for each row. Each
+    grid point is one vectorized pass over all series; only the running best
+    per series is kept, so memory stays at the size of `values`.
+    """
+    n_series = values.shape[0]
+    best_mse = np.full(n_series, np.inf)
+    best_alpha = np.full(n_series, alpha_grid[0], dtype=np.float64)
+    best_beta = np.full(n_series, beta_grid[0], dtype=np.float64)
+    for a in alpha_grid:
+        for b in beta_grid:
+            _, _, sse, n_errors = holt_filter(values, a, b)
+            mse = np.where(n_errors > 0, sse / np.maximum(n_errors, 1), np.inf)
+            better = mse < best_mse  # strict, so ties keep the earlier grid point
+            best_mse = np.where(better, mse, best_mse)
+            best_alpha = np.where(better, a, best_alpha)
+            best_beta = np.where(better, b, best_beta)
+    return best_alpha, best_beta
+
+def holt_forecast(values, horizon=HORIZON, alpha=None, beta=None, z=Z_95):
+    """
+    Forecasts every row of `values` `horizon` days ahead.
+    If alpha/beta are not given they are chosen per series from the grid.
+    Returns (forecast, lower, upper), each of shape (series x horizon).
+    """
+    if alpha is None or beta is None:
+        alpha, beta = fit_parameters(values)
+    level, trend, sse, n_errors = holt_filter(values, alpha, beta)
+
+    steps = np.arange(1, horizon + 1)
+    forecast = level[:, None] + trend[:, None] * steps[None, :]
+
+    # Holt h-step variance: sigma^2 * (1 + sum_{j<h} (alpha * (1 + beta * j))^2)
+    sigma2 = np.where(n_errors > 0, sse / np.maximum(n_errors, 1), np.nan)
+    alpha = np.broadcast_to(alpha, level.shape)[:, None]
+    beta = np.broadcast_to(beta, level.shape)[:, None]
+    j = np.arange(horizon)[None, :]
+    psi2 = np.where(j == 0, 0.0, (alpha * (1 + beta * j)) ** 2)
+    width = z * np.sqrt(sigma2[:, None] * (1 + np.cumsum(psi2, axis=1)))
+    return forecast, forecast - width, forecast + width
+
+# --- Forecast Board ---
+def build_board(df=None, horizon=HORIZON):
+    """
+    Forecasts every (State, Commodity, Market) series in the price store at once.
+    Returns a long DataFrame with one row per series and forecast day.
+    """
+    if df is None:
+        df = price_store.load_all(columns=SERIES_COLS + ["Modal_Price"])
+    values, series_index, dates = aligned_matrix(df)
+    forecast, lower, upper = holt_forecast(values, horizon=horizon)
+
+    future = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=horizon, freq="D")
+    board = pd.DataFrame({
+        "date": np.tile(future, len(series_index)),
+        "price": forecast.ravel(),
+        "lower": lower.ravel(),
+        "upper": upper.ravel(),
+    })
+    keys = series_index.to_frame(index=False).loc[np.repeat(np.arange(len(series_index)), horizon)]
+    board = pd.concat([keys.reset_index(drop=True), board], axis=1)
+    return board.dropna(subset=["price"])
+
+def save_board(board, path=BOARD_PATH):
+    tmp_path = path + ".tmp"
+    board.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def load_board(path=BOARD_PATH):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+if __name__ == "__main__":
+    # Usage: python batch_forecast.py [horizon_days]
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else HORIZON
+    result = build_board(horizon=days)
+    save_board(result)
+    print(f"Saved {result[SERIES_COLS].drop_duplicates().shape[0]} series forecasts to {BOARD_PATH}")
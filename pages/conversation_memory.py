@@ -0,0 +1,107 @@
+"""
+Token-budgeted memory for the chatbot session.
+
+The system prompt and the most recent turns are kept verbatim; older turns
+are folded into one running summary message (what the farmer asked, the
+start of each answer) and their tool outputs are dropped. The history that
+is stored and resent every turn therefore stays within a fixed budget no
+matter how long the session runs. Summaries are extractive, so compaction
+costs no extra model call.
+"""
+import re
+
+TOKEN_BUDGET = 3000          # whole history sent with each request
+SUMMARY_BUDGET = 600         # part of the budget the summary may use
+KEEP_RECENT_TURNS = 2        # turns always kept verbatim
+TOOL_RESULT_MAX_CHARS = 1500 # tool outputs kept from earlier turns are trimmed to this
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for English prose).
+    Good enough for budgeting; no tokenizer download needed.
+    """
+    return len(text or "") // 4 + 1
+
+def message_tokens(message):
+    tokens = estimate_tokens(getattr(message, "content", "")) + 4
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(tool_call.function.arguments) + 8
+    return tokens
+
+def _is_summary(message):
+    return message.role == "system" and (message.content or "").startswith(SUMMARY_PREFIX)
+
+def split_turns(messages):
+    """
+    Returns (system_messages, summary_lines, turns); a turn is a user message
+    plus every assistant/tool message that follows it.
+    """
+    system, summary_lines, turns = [], [], []
+    for message in messages:
+        if _is_summary(message):
+            summary_lines = message.content[len(SUMMARY_PREFIX):].strip().splitlines()
+        elif message.role == "system" and not turns:
+            system.append(message)
+        elif message.role == "user" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return system, summary_lines, turns
+
+def _shorten(text, limit):
+    text = re.sub(r"\s+", " ", text or "").strip()
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+def summarize_turn(turn):
+    question = next((m.content for m in turn if m.role == "user"), "")
+    answers = [m.content for m in turn if m.role == "assistant" and m.content and not getattr(m, "tool_calls", None)]
+    answer = answers[-1] if answers else ""
+    first_sentences = " ".join(re.split(r"(?<=[.!?])\s+", answer)[:2])
+    return f"- Farmer asked: {_shorten(question, 160)} | Answer: {_shorten(first_sentences, 240)}"
+
+def _trim_tool_results(turn, message_cls):
+    trimmed = []
+    for m in turn:
+        if m.role == "tool" and len(m.content or "") > TOOL_RESULT_MAX_CHARS:
+            m = message_cls(role="tool", name=getattr(m, "name", None), tool_call_id=getattr(m, "tool_call_id", None),
+                            content=m.content[:TOOL_RESULT_MAX_CHARS] + " …(truncated)")
+        trimmed.append(m)
+    return trimmed
+
+def compact_history(messages, budget=TOKEN_BUDGET, keep_recent=KEEP_RECENT_TURNS):
+    """
+    Returns a new message list within `budget` estimated tokens: system
+    prompt, one summary message for the folded turns, then the most recent
+    turns verbatim (tool outputs in them trimmed).
+    """
+    from mistralai.models.chat_completion import ChatMessage
+
+    system, summary_lines, turns = split_turns(messages)
+    turns = [_trim_tool_results(turn, ChatMessage) for turn in turns]
+    used = sum(message_tokens(m) for m in system) + SUMMARY_BUDGET
+
+    # Newest turns first: the last `keep_recent` always stay, older ones while they fit.
+    kept = []
+    for index in range(len(turns) - 1, -1, -1):
+        cost = sum(message_tokens(m) for m in turns[index])
+        if len(kept) >= keep_recent and used + cost > budget:
+            break
+        kept.insert(0, turns[index])
+        used += cost
+    folded = turns[:len(turns) - len(kept)]
+
+    summary_lines = summary_lines + [summarize_turn(turn) for turn in folded]
+    while summary_lines and estimate_tokens("\n".join(summary_lines)) > SUMMARY_BUDGET:
+        summary_lines.pop(0)  # the oldest facts go first
+
+    compacted = list(system)
+    if summary_lines:
+        compacted.append(ChatMessage(role="system", content=SUMMARY_PREFIX + "\n" + "\n".join(summary_lines)))
+    for turn in kept:
+        compacted.extend(turn)
+    return compacted
+
+def history_tokens(messages):
+    return sum(message_tokens(m) for m in messages)
@@ -1,78 +1,211 @@
+import io
+import os
+import numpy as np
 import streamlit as st
 from PIL import Image
-import torch
-from transformers import AutoImageProcessor, AutoModelForImageClassification
+import pandas as pd
 
-# --- Load Model and Processor from Hugging Face Hub ---
+import result_cache
+import tracing
+from image_preprocessing import LeafPreprocessor
+
+MODEL_NAME = "wambugu71/crop_leaf_diseases_vit"
+# "pytorch" (fp32 from the Hub), "onnx-int8" or "onnx-fp32" (exports made by convert.py)
+MODEL_RUNTIME = os.getenv("DISEASE_MODEL_RUNTIME", "pytorch")
+# Set FAST_PREPROCESSING=0 to fall back to the generic Hugging Face image processor.
+FAST_PREPROCESSING = os.getenv("FAST_PREPROCESSING", "1") == "1"
+
+# --- Load Model and Processor ---
 @st.cache_resource
-def load_model_and_processor():
+def load_model_and_processor(runtime=MODEL_RUNTIME):
     """
-    Loads the model and processor from the Hugging Face Hub.
+    Loads the model and processor for the selected runtime.
     Using st.cache_resource ensures this is done only once.
+    torch/transformers are imported here, not at module level, so the page
+    renders before the heavy libraries are loaded. The ONNX runtimes never
+    import them (unless FAST_PREPROCESSING=0 asks for the Hugging Face processor).
     """
     try:
-        processor = AutoImageProcessor.from_pretrained("wambugu71/crop_leaf_diseases_vit")
-        model = AutoModelForImageClassification.from_pretrained("wambugu71/crop_leaf_diseases_vit")
+        with tracing.span("disease.model_load", runtime=runtime, fast_preprocessing=FAST_PREPROCESSING):
+            if runtime.startswith("onnx"):
+                from onnx_classifier import load_onnx_classifier, ONNX_MODEL_DIR
+                model = load_onnx_classifier(runtime)
+                model_source = ONNX_MODEL_DIR
+            else:
+                from transformers import AutoModelForImageClassification
+                model = AutoModelForImageClassification.from_pretrained(MODEL_NAME)
+                model_source = MODEL_NAME
+            if FAST_PREPROCESSING:
+                processor = None
+            else:
+                from transformers import AutoImageProcessor
+                processor = AutoImageProcessor.from_pretrained(model_source)
+            if processor is None:
+                processor = LeafPreprocessor.from_config_file()
         return processor, model
     except Exception as e:
-        st.error(f"Error loading model from Hugging Face Hub: {e}")
+        st.error(f"Error loading the {runtime} model: {e}")
         return None, None
 
+# --- Advice Lookup ---
+# You can add logic here to provide advice based on the disease name
+ADVICE = {
+    "Rice Blast": "Remove and destroy infected leaves. Improve water drainage. Consult a local farming advisor.",
+    "Rice Sheath Blight": "Reduce nitrogen fertilizer. Use a fungicide if necessary. Ensure proper plant spacing.",
+    "Rice Brown Spot": "Improve soil fertility, especially with potassium. Use a recommended fungicide.",
+    # Add more diseases and their advice as needed
+}
+
+DEFAULT_BATCH_SIZE = 16
+
+# --- Model Inference ---
+def predict_batch(images, processor, model):
+    """
+    Preprocesses a list of RGB images together and runs one forward pass.
+    Returns a list of (label, confidence) tuples in input order.
+    ONNX models work on numpy arrays end to end; only PyTorch models import torch.
+    """
+    framework = getattr(model, "framework", "pt")
+    with tracing.span("disease.preprocess", images=len(images)):
+        inputs = processor(images=images, return_tensors=framework)
+    with tracing.span("disease.inference", images=len(images), runtime=MODEL_RUNTIME):
+        if framework == "np":
+            logits = np.asarray(model(**inputs).logits, dtype=np.float64)
+        else:
+            import torch
+            with torch.no_grad():
+                logits = model(**inputs).logits.double().numpy()
+
+    # Numerically stable softmax over the label axis.
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    probabilities = exp / exp.sum(axis=-1, keepdims=True)
+    indices = probabilities.argmax(axis=-1)
+    confidences = probabilities[np.arange(len(indices)), indices]
+    return [(model.config.id2label[i], c) for i, c in zip(indices.tolist(), confidences.tolist())]
+
+def build_result(predicted_label, confidence_score):
+    return {
+        "disease_name": predicted_label,
+        "confidence": f"{confidence_score * 100:.2f}%",
+        "first_step_advice": ADVICE.get(predicted_label, "No specific advice available. Consult an expert."),
+        "description": f"The model has identified a high probability of **{predicted_label}**."
+    }
+
+# --- Cached Inference ---
+def decode_upload(image_bytes, processor):
+    # The fast preprocessor decodes JPEGs straight to (near) model size.
+    with tracing.span("disease.decode", bytes=len(image_bytes)):
+        if isinstance(processor, LeafPreprocessor):
+            return processor.decode(image_bytes)
+        return Image.open(io.BytesIO(image_bytes)).convert("RGB")
+
+def predict_with_cache(images_bytes, processor, model, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Classifies raw uploads, skipping inference for any image whose bytes (or,
+    if enabled, perceptual hash) are already in the shared result cache.
+    Only cache misses are decoded and sent to the model, in batches.
+    Returns a list with a (label, confidence) tuple or an Exception per image.
+    """
+    cache = result_cache.get_cache()
+    outcomes = [None] * len(images_bytes)
+    pending = []  # (index, key, phash, image) still needing inference
+
+    with tracing.span("disease.cache_lookup", images=len(images_bytes)) as attrs:
+        for i, image_bytes in enumerate(images_bytes):
+            key = result_cache.content_hash(image_bytes, MODEL_RUNTIME)
+            hit = cache.get(key)
+            if hit is not None:
+                outcomes[i] = (hit["label"], hit["confidence"])
+                continue
+            try:
+                image = decode_upload(image_bytes, processor)
+            except Exception as e:
+                outcomes[i] = e
+                continue
+            phash = result_cache.perceptual_hash(image) if cache.phash_max_distance else None
+            similar = cache.get_similar(phash, MODEL_RUNTIME)
+            if similar is not None:
+                cache.put(key, similar, phash)
+                outcomes[i] = (similar["label"], similar["confidence"])
+                continue
+            pending.append((i, key, phash, image))
+        attrs["misses"] = len(pending)
+
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        predictions = predict_batch([image for _, _, _, image in chunk], processor, model)
+        for (i, key, phash, _), (label, confidence) in zip(chunk, predictions):
+            cache.put(key, {"label": label, "confidence": confidence}, phash)
+            outcomes[i] = (label, confidence)
+    return outcomes
+
 # --- Image Analysis Function ---
-def analyze_image_with_model(uploaded_image, processor, model):
+def analyze_image_with_model(uploaded_image, processor, model, image_bytes=None):
     """
     Analyzes an uploaded image using the loaded model.
+    When the raw upload bytes are given, repeat analyses are served from the result cache.
     """
     if not all([processor, model]):
         return {"error": "Model could not be loaded."}
 
-    with st.spinner('Analyzing the crop leaf... Please wait.'):
-        # Ensure image is in RGB format
-        image = uploaded_image.convert("RGB")
-        
-        # Preprocess the image for the model
-        inputs = processor(images=image, return_tensors="pt")
+    with st.spinner('Analyzing the crop leaf... Please wait.'), tracing.span("disease.analyze"):
+        if image_bytes is not None:
+            outcome = predict_with_cache([image_bytes], processor, model)[0]
+            if isinstance(outcome, Exception):
+                return {"error": f"Could not read the image: {outcome}"}
+            predicted_label, confidence_score = outcome
+        else:
+            # Ensure image is in RGB format
+            image = uploaded_image.convert("RGB")
+            predicted_label, confidence_score = predict_batch([image], processor, model)[0]
+        return build_result(predicted_label, confidence_score)
 
-        # Make a prediction
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            
-        # Get predicted class index and confidence score
-        predicted_class_idx = logits.argmax(-1).item()
-        probabilities = torch.nn.functional.softmax(logits, dim=1)[0]
-        confidence_score = probabilities[predicted_class_idx].item()
-        
-        # Get the predicted label from the model's config
-        predicted_label = model.config.id2label[predicted_class_idx]
-        
-        # --- You can add logic here to provide advice based on the disease name ---
-        advice = {
-            "Rice Blast": "Remove and destroy infected leaves. Improve water drainage. Consult a local farming advisor.",
-            "Rice Sheath Blight": "Reduce nitrogen fertilizer. Use a fungicide if necessary. Ensure proper plant spacing.",
-            "Rice Brown Spot": "Improve soil fertility, especially with potassium. Use a recommended fungicide.",
-            # Add more diseases and their advice as needed
-        }
-        
-        return {
-            "disease_name": predicted_label,
-            "confidence": f"{confidence_score * 100:.2f}%",
-            "first_step_advice": advice.get(predicted_label, "No specific advice available. Consult an expert."),
-            "description": f"The model has identified a high probability of **{predicted_label}**."
-        }
+def analyze_images_batch(uploaded_files, processor, model, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Analyzes many uploaded leaf photos in batches of `batch_size`.
+    Images are decoded and preprocessed one batch at a time, so memory stays
+    bounded by the batch size rather than the number of uploads; photos seen
+    before are answered from the result cache.
+    Returns a DataFrame with one row per image.
+    """
+    rows = []
+    progress = st.progress(0.0)
+    for start in range(0, len(uploaded_files), batch_size):
+        chunk = uploaded_files[start:start + batch_size]
+        outcomes = predict_with_cache([f.getvalue() for f in chunk], processor, model, batch_size)
+        for f, outcome in zip(chunk, outcomes):
+            if isinstance(outcome, Exception):
+                rows.append({"Image": f.name, "Disease": "Unreadable image", "Confidence": None, "Advice": str(outcome)})
+                continue
+            label, confidence = outcome
+            rows.append({
+                "Image": f.name,
+                "Disease": label,
+                "Confidence": round(confidence * 100, 2),
+                "Advice": ADVICE.get(label, "No specific advice available. Consult an expert."),
+            })
+        progress.progress(min(1.0, (start + len(chunk)) / len(uploaded_files)))
+    progress.empty()
+    return pd.DataFrame(rows, columns=["Image", "Disease", "Confidence", "Advice"])
 
 # --- Streamlit App UI ---
 def show_page():
     st.title("🌾 Crop Disease Analyzer")
     st.write("Upload a photo of a crop leaf, and our AI will identify potential diseases and provide immediate advice.")
 
+    mode = st.radio("Mode", ["Single image", "Batch (many images)"], horizontal=True)
+
+    if mode == "Batch (many images)":
+        show_batch_mode()
+        return
+
     # File uploader widget
     uploaded_file = st.file_uploader("Choose a leaf image...", type=["jpg", "jpeg", "png"])
 
-    # Load model and processor only once
-    processor, model = load_model_and_processor()
-
     if uploaded_file is not None:
+        # Load model and processor only once, and only when there is something to analyze
+        processor, model = load_model_and_processor()
+
         # Open the image using PIL
         image = Image.open(uploaded_file)
         
@@ -82,7 +215,7 @@ def show_page():
             st.image(image, caption="Uploaded Leaf Image", use_column_width=True)
             
         # Perform analysis on the uploaded image
-        analysis_result = analyze_image_with_model(image, processor, model)
+        analysis_result = analyze_image_with_model(image, processor, model, image_bytes=uploaded_file.getvalue())
 
         with col2:
             st.subheader("Analysis Result")
@@ -95,5 +228,21 @@ def show_page():
                 st.markdown("---")
                 st.info(f"**Description:** {analysis_result['description']}")
 
+def show_batch_mode():
+    uploaded_files = st.file_uploader("Choose leaf images...", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+    batch_size = st.slider("Batch size", min_value=1, max_value=64, value=DEFAULT_BATCH_SIZE)
+
+    if uploaded_files and st.button(f"Analyze {len(uploaded_files)} images"):
+        processor, model = load_model_and_processor()
+        if not all([processor, model]):
+            st.error("Model could not be loaded.")
+            return
+        with st.spinner(f'Analyzing {len(uploaded_files)} crop leaves... Please wait.'):
+            results = analyze_images_batch(uploaded_files, processor, model, batch_size=batch_size)
+
+        st.subheader("Analysis Results")
+        st.dataframe(results, use_container_width=True)
+        st.download_button("Download results (CSV)", results.to_csv(index=False), file_name="leaf_analysis.csv", mime="text/csv")
+
 if __name__ == "__main__":
     show_page()
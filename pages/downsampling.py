@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# --- Largest-Triangle-Three-Buckets ---
+def lttb_indices(x, y, threshold):
+    """
+    Picks `threshold` points of (x, y) that keep the visual shape of the
+    series (Steinarsson's Largest-Triangle-Three-Buckets): the first and last
+    points are kept, and from each bucket in between the point forming the
+    largest triangle with the previously kept point and the average of the
+    next bucket. Peaks and dips survive, unlike with every-nth sampling.
+    x must be increasing. Returns the indices of the kept points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        # Twice the triangle area for every candidate in the bucket at once.
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+def downsample(df, threshold, x_col="date", y_col="price"):
+    """
+    Returns the rows of df (sorted by x_col) kept by LTTB for a budget of
+    `threshold` points; small frames come back unchanged.
+    """
+    if len(df) <= threshold:
+        return df
+    x = df[x_col]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.values.astype("datetime64[ns]").astype(np.int64)
+    return df.iloc[lttb_indices(x, df[y_col].to_numpy(), threshold)]
@@ -0,0 +1,117 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+import numpy as np
+
+# --- Cache Location and Limits ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(BASE_DIR, "cache", "query_embeddings.sqlite3"))
+MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    query TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, query)
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+def normalize_query(text):
+    """
+    Lower-cases, collapses whitespace and drops trailing punctuation, so
+    "How to grow pepper? " and "how to grow pepper" share one embedding.
+    """
+    return re.sub(r"\s+", " ", text).strip().rstrip("?.!").strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Persistent, LRU-bounded cache of query embeddings keyed by
+    (model name, normalized query text), shared by all worker processes.
+    Vectors are stored as raw float32 bytes.
+    """
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, model, query):
+        key = normalize_query(query)
+        conn = self._conn()
+        row = conn.execute("SELECT vector FROM embeddings WHERE model = ? AND query = ?", (model, key)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE embeddings SET last_used = ? WHERE model = ? AND query = ?", (time.time(), model, key))
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put(self, model, query, vector):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO embeddings (model, query, vector, last_used) VALUES (?, ?, ?, ?)",
+            (model, normalize_query(query), np.asarray(vector, dtype=np.float32).tobytes(), time.time()),
+        )
+        conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN ("
+            "SELECT rowid FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def get_or_embed(self, model, query, embed):
+        """
+        Returns the cached embedding, or calls embed(query) and stores the result.
+        """
+        vector = self.get(model, query)
+        self._count(vector is not None)
+        if vector is None:
+            vector = embed(query)
+            self.put(model, query, vector)
+        return vector
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": self._conn().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0],
+        }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_cache():
+    """
+    Returns the process-wide embedding cache instance.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
@@ -0,0 +1,88 @@
+import io
+import os
+import json
+import threading
+import numpy as np
+from PIL import Image
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preprocessor_config.json")
+
+
+class LeafPreprocessor:
+    """
+    Fast replacement for the generic AutoImageProcessor, driven by
+    preprocessor_config.json (resize, rescale, normalize).
+
+    - JPEGs are decoded at reduced size: PIL's draft mode lets libjpeg scale
+      by 1/2, 1/4 or 1/8 during decode, so a 12 MP photo is never fully expanded.
+    - Rescale and normalize are folded into one multiply-add per channel
+      ((x * rescale - mean) / std == x * scale + offset), written straight
+      into a preallocated float32 NCHW buffer that is reused between calls.
+
+    Called like the Hugging Face processor: processor(images=[...], return_tensors="pt").
+    The returned tensor shares the buffer, so use it before the next call.
+    """
+    def __init__(self, config):
+        self.height = config["size"]["height"]
+        self.width = config["size"]["width"]
+        self.resample = config.get("resample", Image.BILINEAR)
+        self.do_resize = config.get("do_resize", True)
+
+        rescale = config.get("rescale_factor", 1 / 255) if config.get("do_rescale", True) else 1.0
+        mean = np.array(config.get("image_mean", [0.0] * 3), dtype=np.float32)
+        std = np.array(config.get("image_std", [1.0] * 3), dtype=np.float32)
+        if not config.get("do_normalize", True):
+            mean, std = np.zeros(3, np.float32), np.ones(3, np.float32)
+        self.scale = (rescale / std).reshape(3, 1, 1).astype(np.float32)
+        self.offset = (-mean / std).reshape(3, 1, 1).astype(np.float32)
+
+        # One buffer per thread: Streamlit sessions run on separate threads.
+        self._local = threading.local()
+
+    @classmethod
+    def from_config_file(cls, path=CONFIG_PATH):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    # --- Decoding ---
+    def decode(self, image):
+        """
+        Returns an RGB PIL image at the model input size from bytes, a file-like
+        object or an already opened PIL image.
+        """
+        if isinstance(image, (bytes, bytearray)):
+            image = Image.open(io.BytesIO(image))
+        elif not isinstance(image, Image.Image):
+            image = Image.open(image)
+
+        if image.format == "JPEG" and self.do_resize:
+            # Picks the largest DCT scale that still covers the target size.
+            image.draft("RGB", (self.width, self.height))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if self.do_resize and image.size != (self.width, self.height):
+            image = image.resize((self.width, self.height), resample=self.resample)
+        return image
+
+    # --- Tensor Conversion ---
+    def _buffer(self, batch_size):
+        buf = getattr(self._local, "buffer", None)
+        if buf is None or buf.shape[0] < batch_size:
+            buf = np.empty((batch_size, 3, self.height, self.width), dtype=np.float32)
+            self._local.buffer = buf
+        return buf
+
+    def __call__(self, images, return_tensors="pt"):
+        if not isinstance(images, (list, tuple)):
+            images = [images]
+        buf = self._buffer(len(images))
+        for i, image in enumerate(images):
+            pixels = np.asarray(self.decode(image), dtype=np.uint8).transpose(2, 0, 1)
+            # Fused rescale + normalize, in place in the shared buffer.
+            np.multiply(pixels, self.scale, out=buf[i])
+            buf[i] += self.offset
+        pixel_values = buf[:len(images)]
+        if return_tensors == "pt":
+            import torch
+            pixel_values = torch.from_numpy(pixel_values)
+        return {"pixel_values": pixel_values}
@@ -0,0 +1,59 @@
+"""
+Reports the import-time cost of each app module, using CPython's -X importtime.
+
+    python import_report.py                 # streamlit (login screen) and all page modules
+    python import_report.py marketbest -n 15
+
+Each module is imported in a fresh interpreter so the numbers are cold-start costs.
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+PAGES_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE_MODULES = [
+    "streamlit", "main_app", "disease_analyzer", "mistral_chatbot",
+    "price_prediction", "marketbest", "unified_tools",
+]
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    """
+    Imports `module` in a new interpreter and returns (total_seconds, [(package, cumulative_us)]),
+    where packages are the top-level imports triggered by the module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PAGES_DIR, capture_output=True, text=True,
+    )
+    packages = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        # Depth 1 entries are the direct imports of the interpreter/`-c` code.
+        if len(indent) <= 1:
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0) + int(cumulative)
+            total += int(cumulative)
+    if result.returncode != 0:
+        print(f"  ! import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+    return total / 1e6, sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import-time report.")
+    parser.add_argument("modules", nargs="*", default=PAGE_MODULES)
+    parser.add_argument("-n", "--top", type=int, default=8, help="Packages to list per module")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        total, packages = measure(module)
+        print(f"{module}: {total:.3f}s")
+        for name, micros in packages[:args.top]:
+            print(f"    {name:<28} {micros / 1e6:8.3f}s")
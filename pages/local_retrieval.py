@@ -0,0 +1,227 @@
+"""
+Offline retrieval over the knowledge documents, used when the remote
+embedding API or the Chroma database is unavailable (or by choice, with
+KNOWLEDGE_BACKEND=local).
+
+- BM25 over an inverted index of overlapping word-window chunks, persisted
+  to disk and rebuilt only when a document changes.
+- Optionally, a local sentence-transformers model (LOCAL_EMBEDDING_MODEL)
+  adds dense similarity; both rankings are merged with reciprocal rank fusion.
+
+    python local_retrieval.py "When does the Mundakan season start?"
+"""
+import os
+import re
+import sys
+import json
+import math
+import hashlib
+import threading
+from collections import Counter, defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCUMENTS_PATH = os.getenv("KNOWLEDGE_DOCUMENTS_PATH", os.path.join(BASE_DIR, "farmbot", "knowledge_documents"))
+INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", os.path.join(BASE_DIR, "cache", "local_index.json"))
+# e.g. "sentence-transformers/all-MiniLM-L6-v2"; empty means BM25 only
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "")
+
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "should", "that", "the", "this", "to", "what", "when", "which", "with",
+}
+
+# --- Text Processing ---
+def tokenize(text):
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """
+    Splits text into overlapping windows of whole words. Short documents
+    come back as a single chunk.
+    """
+    words = text.split()
+    if len(words) <= chunk_words:
+        return [" ".join(words)] if words else []
+    step = chunk_words - overlap
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+def read_documents(path=DOCUMENTS_PATH):
+    """
+    Returns {filename: text} for every .txt document.
+    """
+    documents = {}
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(path, filename), "r", encoding="utf-8") as f:
+                documents[filename] = f.read()
+    return documents
+
+def corpus_fingerprint(documents):
+    digest = hashlib.sha256()
+    for name, text in sorted(documents.items()):
+        digest.update(name.encode("utf-8"))
+        digest.update(hashlib.sha256(text.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+# --- BM25 Index ---
+def build_index(documents):
+    """
+    Builds the chunk list and inverted index {term: [[chunk_id, term_freq], ...]}.
+    """
+    chunks, lengths = [], []
+    postings = defaultdict(list)
+    for name, text in sorted(documents.items()):
+        for chunk in chunk_text(text):
+            chunk_id = len(chunks)
+            tokens = tokenize(chunk)
+            chunks.append({"source": name, "text": chunk})
+            lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                postings[term].append([chunk_id, freq])
+    return {
+        "fingerprint": corpus_fingerprint(documents),
+        "chunks": chunks,
+        "lengths": lengths,
+        "avg_length": (sum(lengths) / len(lengths)) if lengths else 0.0,
+        "postings": dict(postings),
+    }
+
+def bm25_scores(index, query):
+    """
+    Returns {chunk_id: score}; only chunks sharing a term with the query are touched.
+    """
+    n_chunks = len(index["chunks"])
+    scores = defaultdict(float)
+    for term in set(tokenize(query)):
+        postings = index["postings"].get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+        for chunk_id, freq in postings:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * index["lengths"][chunk_id] / index["avg_length"])
+            scores[chunk_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+    return scores
+
+
+class LocalRetriever:
+    """
+    Loads (or rebuilds) the on-disk index once and answers queries from memory.
+    """
+    def __init__(self, documents_path=DOCUMENTS_PATH, index_path=INDEX_PATH, embedding_model=LOCAL_EMBEDDING_MODEL):
+        self.documents_path = documents_path
+        self.index_path = index_path
+        self.embedding_model_name = embedding_model
+        self.index = self._load_or_build()
+        self._encoder = None
+        self._chunk_vectors = None
+        self._encoder_lock = threading.Lock()
+
+    def _load_or_build(self):
+        documents = read_documents(self.documents_path)
+        fingerprint = corpus_fingerprint(documents)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("fingerprint") == fingerprint:
+                return index
+
+        index = build_index(documents)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+        return index
+
+    # --- Optional dense scoring ---
+    def _vectors_path(self):
+        model_hash = hashlib.sha1(self.embedding_model_name.encode()).hexdigest()[:8]
+        return f"{self.index_path}.{model_hash}.npz"
+
+    def _load_encoder(self):
+        """
+        Loads the encoder and the chunk vectors once. The vectors are cached
+        on disk with the corpus fingerprint and re-encoded when it differs,
+        so an edited document never keeps a stale vector.
+        """
+        import numpy as np
+        with self._encoder_lock:
+            if self._encoder is not None:
+                return
+            from sentence_transformers import SentenceTransformer
+            encoder = SentenceTransformer(self.embedding_model_name)
+            vectors_path = self._vectors_path()
+            vectors = None
+            if os.path.exists(vectors_path):
+                with np.load(vectors_path) as cached:
+                    if str(cached["fingerprint"]) == self.index["fingerprint"]:
+                        vectors = cached["vectors"]
+            if vectors is None:
+                texts = [c["text"] for c in self.index["chunks"]]
+                vectors = encoder.encode(texts, normalize_embeddings=True)
+                tmp_path = vectors_path + ".tmp.npz"
+                np.savez(tmp_path, vectors=vectors, fingerprint=np.array(self.index["fingerprint"]))
+                os.replace(tmp_path, vectors_path)
+            self._chunk_vectors = vectors
+            self._encoder = encoder
+
+    def _dense_ranking(self, query):
+        if not self.embedding_model_name:
+            return []
+        import numpy as np
+        if self._encoder is None:
+            self._load_encoder()
+        query_vector = self._encoder.encode([query], normalize_embeddings=True)[0]
+        similarities = self._chunk_vectors @ query_vector
+        return [int(i) for i in np.argsort(-similarities)]
+
+    def search(self, query, n_results=2):
+        """
+        Returns the top chunks as [{"source", "text", "score"}], best first.
+        """
+        sparse = bm25_scores(self.index, query)
+        rankings = [sorted(sparse, key=sparse.get, reverse=True)]
+        dense = self._dense_ranking(query)
+        if dense:
+            rankings.append(dense)
+
+        # Reciprocal rank fusion: robust to the different score scales of BM25 and cosine.
+        fused = defaultdict(float)
+        for ranking in rankings:
+            for rank, chunk_id in enumerate(ranking):
+                fused[chunk_id] += 1.0 / (RRF_K + rank + 1)
+        top = sorted(fused, key=fused.get, reverse=True)[:n_results]
+        return [dict(self.index["chunks"][i], score=round(fused[i], 5)) for i in top]
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+def get_retriever():
+    """
+    Returns the process-wide retriever, building the index on first use.
+    """
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = LocalRetriever()
+        return _retriever
+
+def search(query, n_results=2):
+    return get_retriever().search(query, n_results=n_results)
+
+
+if __name__ == "__main__":
+    for hit in search(" ".join(sys.argv[1:]) or "Mundakan season rice varieties", n_results=3):
+        print(f"[{hit['score']}] {hit['source']}: {hit['text'][:120]}...")
@@ -1,19 +1,17 @@
 import streamlit as st
 import hashlib
-import os
-import pickle
+
+from user_store import UserStore
 
 # --- Page Config ---
 st.set_page_config(page_title="Login | Kerala Farming Assistant", page_icon="🔑")
 
-# --- User database storage ---
-USER_FILE = "users.pkl"
+# --- User database storage (opened once per process, migrates users.pkl on first run) ---
+@st.cache_resource
+def get_user_store():
+    return UserStore()
 
-if os.path.exists(USER_FILE):
-    with open(USER_FILE, "rb") as f:
-        users = pickle.load(f)
-else:
-    users = {"admin": hashlib.sha256("admin123".encode()).hexdigest()}
+users = get_user_store()
 
 # --- Session State Initialization ---
 if "logged_in" not in st.session_state:
@@ -25,11 +23,6 @@ if "username" not in st.session_state:
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-# --- Save Users to file ---
-def save_users():
-    with open(USER_FILE, "wb") as f:
-        pickle.dump(users, f)
-
 # --- Login Function ---
 def login():
     st.title("🔑 Login")
@@ -38,7 +31,7 @@ def login():
 
     if st.button("Login"):
         hashed = hash_password(password)
-        if username in users and users[username] == hashed:
+        if users.check_password(username, hashed):
             st.session_state.logged_in = True
             st.session_state.username = username
             st.success(f"Welcome, {username}!")
@@ -53,15 +46,15 @@ def signup():
     confirm_pass = st.text_input("Confirm Password", type="password", key="signup_confirm")
 
     if st.button("Signup"):
-        if new_user in users:
+        if users.exists(new_user):
             st.error("❌ Username already exists")
         elif new_pass != confirm_pass:
             st.error("❌ Passwords do not match")
         elif len(new_pass) < 4:
             st.error("❌ Password too short (min 4 characters)")
+        elif not users.create_user(new_user, hash_password(new_pass)):
+            st.error("❌ Username already exists")
         else:
-            users[new_user] = hash_password(new_pass)
-            save_users()
             st.success("✅ Account created! Please login.")
 
 # --- Authentication Flow ---
@@ -1,9 +1,13 @@
 import streamlit as st
+import warmup
 
 def run_app():
     # --- Page Config ---
     st.set_page_config(page_title="Kerala Farming Assistant", page_icon="🌿", layout="wide")
 
+    # --- Preload heavy models in the background (once per process) ---
+    warmup.start_warmup()
+
     # --- Sidebar ---
     with st.sidebar:
         st.header(f"👋 Welcome, {st.session_state.username}")
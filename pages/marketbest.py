@@ -1,42 +1,120 @@
 # price_comparison.py
 
+import os
 import streamlit as st
 import pandas as pd
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+import api_cache
+import price_aggregates
+import tracing
+
+# --- API Settings ---
+RESOURCE_ID = "9ef84268-d588-465a-a308-a864a43d0070"
+# Point DATA_GOV_API_URL at a local stand-in (see mock_data_gov_server.py) to test offline.
+BASE_URL = os.getenv("DATA_GOV_API_URL", f"https://api.data.gov.in/resource/{RESOURCE_ID}")
+REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+MAX_WORKERS = 8
+BULK_LIMIT = 1000
+PRICE_TTL = 30 * 60  # serve without revalidating for 30 minutes
+PRICE_STALE_TTL = 24 * 60 * 60  # then serve stale while refreshing, for up to a day
+RANKING_MAX_AGE_DAYS = 30  # markets with no arrival in this window are left out of the ranking
+
+def get_api_key():
+    return os.getenv("DATA_GOV_API_KEY") or st.secrets["API_KEY"]
+
+# --- Shared keep-alive session ---
+@st.cache_resource
+def get_session():
+    """
+    One pooled session per process, so concurrent fetches reuse TCP/TLS
+    connections instead of opening a new one for every market.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_records(filters, limit):
+    """
+    Calls the data.gov.in resource with the given filters and returns its records.
+    """
+    params = {"api-key": get_api_key(), "format": "json", "limit": limit}
+    params.update({f"filters[{k}]": v for k, v in filters.items()})
+    with tracing.span("http.data_gov", filters=filters, limit=limit) as attrs:
+        response = get_session().get(BASE_URL, params=params, timeout=REQUEST_TIMEOUT)
+        attrs["status"] = response.status_code
+        response.raise_for_status()
+        records = response.json().get('records', [])
+        attrs["records"] = len(records)
+    return records
 
 # --- Data Fetching Function ---
-@st.cache_data
+def _cache_key(*parts):
+    # No date in the key: PRICE_TTL/PRICE_STALE_TTL decide freshness, so the first
+    # request after midnight is served yesterday's price while it is refreshed.
+    return "|".join(parts)
+
+def _fetch_market_record(crop, market):
+    records = fetch_records(
+        {"state.keyword": "Kerala", "market": market, "commodity": crop},
+        limit=1,  # Only most recent price
+    )
+    return records[0] if records else None
+
 def get_price_data(crop, market):
     """
-    Fetches price data from the data.gov.in API for a specific crop and market.
+    Fetches price data from the data.gov.in API for a specific crop and market,
+    through the shared on-disk cache.
     """
-    try:
-        api_key = st.secrets["API_KEY"]
-        resource_id = "9ef84268-d588-465a-a308-a864a43d0070"
-        base_url = f"https://api.data.gov.in/resource/{resource_id}"
-        params = {
-            "api-key": api_key,
-            "format": "json",
-            "filters[state.keyword]": "Kerala",
-            "filters[market]": market,
-            "filters[commodity]": crop,
-            "limit": 1 # Only most recent price
-        }
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        records = data.get('records', [])
-        if not records:
-            return None
-        return records[0]
-    except (requests.exceptions.RequestException, KeyError):
-        return None
+    return api_cache.get_cache().get_or_fetch(
+        "market_record", _cache_key(crop, market), lambda: _fetch_market_record(crop, market),
+        ttl=PRICE_TTL, stale_ttl=PRICE_STALE_TTL,
+    )
+
+def _fetch_state_prices(crop, state):
+    records = fetch_records({"state.keyword": state, "commodity": crop}, limit=BULK_LIMIT)
+
+    latest = {}
+    for record in records:
+        market = record.get('market')
+        date = pd.to_datetime(record.get('arrival_date'), format="%d/%m/%Y", errors="coerce")
+        if market and (market not in latest or date > latest[market][0]):
+            latest[market] = (date, record)
+    return {market: record for market, (_, record) in latest.items()}
+
+def get_state_prices(crop, state="Kerala"):
+    """
+    Fetches every market's records for a crop in one bulk query filtered by
+    state and keeps the most recent record per market.
+    Returns {market: record}, or None if the bulk query failed and nothing is cached.
+    """
+    return api_cache.get_cache().get_or_fetch(
+        "state_prices", _cache_key(state, crop), lambda: _fetch_state_prices(crop, state),
+        ttl=PRICE_TTL, stale_ttl=PRICE_STALE_TTL,
+    )
 
 # --- Function to get prices from all markets ---
 def get_all_market_prices(crop, markets_list):
+    with tracing.span("market_prices.all", crop=crop, markets=len(markets_list)) as attrs:
+        records = dict(get_state_prices(crop) or {})
+
+        # Markets the bulk query did not cover are fetched individually, in parallel.
+        missing = [m for m in markets_list if m not in records]
+        attrs["fallback_markets"] = len(missing)
+        if missing:
+            fetch_market = tracing.propagate(lambda m: get_price_data(crop, m))
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(missing))) as executor:
+                for market, record in zip(missing, executor.map(fetch_market, missing)):
+                    if record:
+                        records[market] = record
+
     price_data = []
     for market in markets_list:
-        record = get_price_data(crop, market)
+        record = records.get(market)
         if record:
             price_data.append({
                 "Market": record.get('market'),
@@ -50,15 +128,62 @@ def get_all_market_prices(crop, markets_list):
     df.dropna(inplace=True)
     return df.set_index('Market')
 
-# --- SHOW PAGE FUNCTION ---
-def show_page():
-    st.header("📊 Daily Market Price Comparison")
-    st.write("Select a crop to see today's prices across major markets in Kerala.")
+# --- Kerala-wide ranking from the materialized aggregates ---
+@st.cache_data
+def get_aggregate_commodities(aggregates_version):
+    # aggregates_version is part of the cache key, so a new ingestion is picked up.
+    return price_aggregates.list_commodities("Kerala")
+
+@st.cache_data
+def get_best_markets(crop, aggregates_version):
+    return price_aggregates.best_markets(crop, state="Kerala", max_age_days=RANKING_MAX_AGE_DAYS)
+
+def show_market_ranking():
+    """
+    Ranks every Kerala market for a crop from the precomputed aggregates:
+    one partition read, no API calls. Markets without an arrival in the last
+    RANKING_MAX_AGE_DAYS (before the newest one) are left out, so a months-old
+    price cannot top the ranking.
+    """
+    version = price_aggregates.version()
+    crops = get_aggregate_commodities(version)
+    if not crops:
+        return False
+
+    default = crops.index("Banana") if "Banana" in crops else 0
+    selected_crop = st.selectbox("Select Crop", crops, index=default)
+    ranking = get_best_markets(selected_crop, version)
+    if ranking.empty:
+        st.warning(f"No price history for {selected_crop} in Kerala.")
+        return True
+
+    as_of = ranking["Arrival_Date"].max()
+    st.subheader(f"📍 {selected_crop} across {len(ranking)} Kerala markets (latest arrivals up to {as_of:%d %b %Y})")
+    st.caption(f"Markets with no arrivals in the {RANKING_MAX_AGE_DAYS} days before that are not ranked.")
+    st.bar_chart(ranking["Modal_Price"].head(15), height=400)
+
+    st.markdown("### 🏷️ Price Summary (per quintal)")
+    columns = {
+        "District": "District",
+        "Arrival_Date": "Last Arrival",
+        "Modal_Price": "Modal Price",
+        "Mean_7d": "7-day Mean",
+        "Mean_30d": "30-day Mean",
+        "Volatility_30d": "30-day Volatility",
+        "Spread": "Min-Max Spread",
+    }
+    st.dataframe(ranking[list(columns)].rename(columns=columns))
+
+    best_market = ranking.index[0]
+    best_price = ranking["Modal_Price"].iloc[0]
+    st.success(f"**Best Market:** The highest recent price for {selected_crop} is in **{best_market}** at **₹{best_price:,.2f}** per quintal.")
+    return True
 
+def show_live_prices():
     crops = ["Rice", "Coconut", "Banana", "Black Pepper", "Ginger", "Rubber"]
     markets = ["Thiruvananthapuram", "Kochi", "Kozhikode", "Thrissur", "Palakkad"]
 
-    selected_crop = st.selectbox("Select Crop", crops)
+    selected_crop = st.selectbox("Select Crop", crops, key="live_crop")
 
     if selected_crop:
         st.subheader(f"📍 Today's Prices for {selected_crop} in Kerala")
@@ -76,3 +201,15 @@ def show_page():
             st.success(f"**Best Market:** You can get the highest price for {selected_crop} today in **{best_market}** at **₹{best_price:,.2f}** per quintal.")
         else:
             st.warning(f"Could not retrieve price data for {selected_crop} today. Please try again later.")
+
+# --- SHOW PAGE FUNCTION ---
+def show_page():
+    st.header("📊 Daily Market Price Comparison")
+    st.write("Select a crop to compare its prices across every market in Kerala.")
+
+    if price_aggregates.aggregates_exist() and show_market_ranking():
+        with st.expander("Live prices from data.gov.in (major markets)"):
+            show_live_prices()
+    else:
+        # No ingested price history yet: compare the major markets live.
+        show_live_prices()
@@ -3,14 +3,20 @@
 import os
 import json
 import time
-from typing import List
+import threading
+from typing import Callable, List, Optional, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 import streamlit as st
 from dotenv import load_dotenv
 
-from mistralai.client import MistralClient
-from mistralai.models.chat_completion import ChatMessage
+# mistralai is imported where it is used, so the page renders without it.
+if TYPE_CHECKING:
+    from mistralai.client import MistralClient
+    from mistralai.models.chat_completion import ChatMessage
 
 from unified_tools import query_knowledge_base, google_search, search_wikipedia
+from conversation_memory import compact_history
+import tracing
 
 # ---------------------------
 # Helper & Agent Logic (unchanged)
@@ -66,8 +72,23 @@ TOOL_FUNCTIONS = {
     "search_wikipedia": search_wikipedia,
 }
 
+# Seconds each tool may take before the agent moves on without it
+TOOL_TIMEOUTS = {
+    "query_knowledge_base": 8,
+    "google_search": 10,
+    "search_wikipedia": 8,
+}
+DEFAULT_TOOL_TIMEOUT = 10
+MAX_TOOL_ROUNDS = 3
+
+# Shared and bounded: a tool the agent gave up on keeps its worker until its
+# HTTP timeout (unified_tools.HTTP_TIMEOUT) ends it, but can never pile up threads.
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="agent-tool")
+
 
-def init_client() -> MistralClient:
+
+def init_client() -> "MistralClient":
+    from mistralai.client import MistralClient
     load_dotenv()
     api_key = os.getenv("MISTRAL_API_KEY")
     if not api_key:
@@ -75,39 +96,134 @@ def init_client() -> MistralClient:
     return MistralClient(api_key=api_key)
 
 
-def agent_respond(client: MistralClient, model: str, user_query: str, messages: List[ChatMessage]) -> str:
-    messages.append(ChatMessage(role="user", content=user_query))
+def run_tool_call(tool_call) -> str:
+    func_name = tool_call.function.name
     try:
-        chat_response = client.chat(model=model, messages=messages, tools=TOOLS)
-    except Exception as e:
-        return f"(Error) Failed to contact model: {e}"
-
-    response_message = chat_response.choices[0].message
+        func_args = json.loads(tool_call.function.arguments)
+    except Exception:
+        func_args = {}
 
-    if getattr(response_message, "tool_calls", None):
-        tool_call = response_message.tool_calls[0]
-        func_name = tool_call.function.name
+    with tracing.span("agent.tool_call", tool=func_name) as attrs:
         try:
-            func_args = json.loads(tool_call.function.arguments)
-        except Exception:
-            func_args = {}
-
-        try:
-            tool_result = TOOL_FUNCTIONS[func_name](**func_args)
+            return str(TOOL_FUNCTIONS[func_name](**func_args))
         except Exception as e:
-            tool_result = f"(Error executing tool {func_name}: {e})"
+            attrs["error"] = f"{type(e).__name__}: {e}"
+            return f"(Error executing tool {func_name}: {e})"
 
-        messages.append(response_message)
-        messages.append(ChatMessage(role="tool", name=func_name, content=str(tool_result)))
+def run_tool_calls(tool_calls) -> List[str]:
+    """
+    Runs every requested tool call in parallel on the shared pool and returns
+    their results in order. A tool that misses its deadline is reported as
+    timed out, so the model still answers with whatever finished in time.
+    A tool's deadline runs from when it starts; one still queued behind busy
+    workers after that long is cancelled instead of being started late.
+    """
+    with tracing.span("agent.tool_round", tools=[tc.function.name for tc in tool_calls]) as attrs:
+        submitted = time.monotonic()
+        calls = []
+        for tool_call in tool_calls:
+            started = threading.Event()
+            calls.append((tool_call, started, TOOL_EXECUTOR.submit(tracing.propagate(_run_when_started), tool_call, started)))
+
+        results, timed_out = [], []
+        for tool_call, started, future in calls:
+            name = tool_call.function.name
+            timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+            try:
+                if not started.wait(max(0.0, submitted + timeout - time.monotonic())):
+                    if future.cancel():
+                        raise FuturesTimeout()
+                    started.wait()  # a worker picked it up just now
+                results.append(future.result(timeout=max(0.0, started.at + timeout - time.monotonic())))
+            except FuturesTimeout:
+                timed_out.append(name)
+                results.append(f"(Tool {name} timed out after {timeout}s; answer with the other results.)")
+        if timed_out:
+            attrs["timed_out"] = timed_out
+    return results
+
+def _run_when_started(tool_call, started):
+    started.at = time.monotonic()
+    started.set()
+    return run_tool_call(tool_call)
 
-        try:
-            final_response = client.chat(model=model, messages=messages)
-            final_answer = final_response.choices[0].message.content
-        except Exception as e:
-            final_answer = f"(Error) Failed to get final model response: {e}"
-    else:
-        final_answer = response_message.content
 
+def stream_chat(client: "MistralClient", model: str, messages: List["ChatMessage"], tools=None,
+                on_token: Optional[Callable[[str], None]] = None, metrics: Optional[dict] = None):
+    """
+    Calls the Mistral streaming API and forwards content tokens to on_token as
+    they arrive. Records the time of the first content token in metrics.
+    Returns (content, tool_calls).
+    """
+    kwargs = {"tools": tools} if tools else {}
+    parts, tool_calls = [], []
+    with tracing.span("llm.chat_stream", model=model, messages=len(messages), tools=bool(tools)) as attrs:
+        started = time.perf_counter()
+        for chunk in client.chat_stream(model=model, messages=messages, **kwargs):
+            delta = chunk.choices[0].delta
+            if getattr(delta, "tool_calls", None):
+                tool_calls.extend(delta.tool_calls)
+            if delta.content:
+                if "first_token_ms" not in attrs:
+                    attrs["first_token_ms"] = round((time.perf_counter() - started) * 1000, 3)
+                if metrics is not None and "first_token_s" not in metrics:
+                    metrics["first_token_s"] = time.perf_counter() - metrics["_start"]
+                parts.append(delta.content)
+                if on_token:
+                    on_token(delta.content)
+        attrs["tool_calls"] = len(tool_calls)
+    return "".join(parts), tool_calls
+
+
+def agent_respond(client: "MistralClient", model: str, user_query: str, messages: List["ChatMessage"],
+                  on_token: Optional[Callable[[str], None]] = None, metrics: Optional[dict] = None,
+                  on_reset: Optional[Callable[[], None]] = None) -> str:
+    """
+    Runs the tool loop: each round, every tool call the model asks for is
+    executed concurrently and fed back, for at most MAX_TOOL_ROUNDS rounds.
+    After that the model must answer with what it has.
+    Every model call is streamed; answer tokens go to on_token as they arrive,
+    and time-to-first-token / total latency are written into metrics.
+    Text from a round that ends in tool calls is not the answer: on_reset is
+    called so the caller can drop what it showed, and its first token does
+    not count as the answer's first token.
+    """
+    from mistralai.models.chat_completion import ChatMessage
+    messages.append(ChatMessage(role="user", content=user_query))
+    metrics = {} if metrics is None else metrics
+    metrics["_start"] = time.perf_counter()
+
+    with tracing.span("agent.respond", model=model) as attrs:
+        final_answer = None
+        for round_number in range(MAX_TOOL_ROUNDS + 1):
+            tools_allowed = round_number < MAX_TOOL_ROUNDS
+            round_metrics = {"_start": metrics["_start"]}
+            try:
+                content, tool_calls = stream_chat(client, model, messages, TOOLS if tools_allowed else None,
+                                                  on_token=on_token, metrics=round_metrics)
+            except Exception as e:
+                if round_number == 0:
+                    metrics["total_s"] = time.perf_counter() - metrics.pop("_start")
+                    return f"(Error) Failed to contact model: {e}"
+                final_answer = f"(Error) Failed to get final model response: {e}"
+                break
+
+            if not tool_calls:
+                if "first_token_s" in round_metrics:
+                    metrics["first_token_s"] = round_metrics["first_token_s"]
+                final_answer = content
+                break
+            if content and on_reset:
+                on_reset()
+
+            messages.append(ChatMessage(role="assistant", content=content, tool_calls=tool_calls))
+            metrics["tool_rounds"] = round_number + 1
+            for tool_call, tool_result in zip(tool_calls, run_tool_calls(tool_calls)):
+                messages.append(ChatMessage(role="tool", name=tool_call.function.name, content=tool_result,
+                                            tool_call_id=getattr(tool_call, "id", None)))
+        attrs["tool_rounds"] = metrics.get("tool_rounds", 0)
+
+    metrics["total_s"] = time.perf_counter() - metrics.pop("_start")
     messages.append(ChatMessage(role="assistant", content=final_answer))
     return final_answer
 
@@ -119,9 +235,12 @@ def show_page():
     st.header("🌾 Kerala Agri-Bot — Chat Assistant")
 
     if "messages" not in st.session_state:
+        from mistralai.models.chat_completion import ChatMessage
         st.session_state.messages = [ChatMessage(role="system", content="You are an expert agricultural assistant for farmers in Kerala.")]
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    if "turn_metrics" not in st.session_state:
+        st.session_state.turn_metrics = []
 
     # CSS for chat bubbles (original colors)
     st.markdown("""
@@ -164,14 +283,38 @@ def show_page():
     if submitted and user_input:
         try:
             client = init_client()
-            with st.spinner("Agri-Bot is thinking..."):
-                answer = agent_respond(client, "mistral-small", user_input, st.session_state.messages)
+            with chat_container:
+                st.markdown(f"<div class='chat-bubble-user'>{user_input}</div>", unsafe_allow_html=True)
+                bubble = st.empty()
+                bubble.markdown("<div class='chat-bubble-bot'><i>Agri-Bot is thinking...</i></div>", unsafe_allow_html=True)
+
+            # Render tokens into the bot bubble as they stream in
+            streamed = []
+            def on_token(token):
+                streamed.append(token)
+                bubble.markdown(f"<div class='chat-bubble-bot'>{''.join(streamed)}</div>", unsafe_allow_html=True)
+
+            # A round that ended in tool calls streamed preamble, not the answer
+            def on_reset():
+                streamed.clear()
+                bubble.markdown("<div class='chat-bubble-bot'><i>Agri-Bot is thinking...</i></div>", unsafe_allow_html=True)
+
+            # Keep the resent history within a fixed token budget
+            st.session_state.messages = compact_history(st.session_state.messages)
+
+            metrics = {}
+            answer = agent_respond(client, "mistral-small", user_input, st.session_state.messages,
+                                   on_token=on_token, metrics=metrics, on_reset=on_reset)
+            bubble.markdown(f"<div class='chat-bubble-bot'>{answer}</div>", unsafe_allow_html=True)
 
             # Append new messages
             st.session_state.chat_history.append(("You", user_input))
             st.session_state.chat_history.append(("Agri-Bot", answer))
+            st.session_state.turn_metrics.append(metrics)
 
-            # Streamlit auto-refreshes the container automatically
+            first_token = metrics.get("first_token_s")
+            st.caption(f"⏱️ First token: {first_token:.2f}s · Total: {metrics['total_s']:.2f}s"
+                       if first_token is not None else f"⏱️ Total: {metrics['total_s']:.2f}s")
         except Exception as e:
             st.error(f"Error: {e}")
 
@@ -0,0 +1,93 @@
+"""
+Local stand-in for the data.gov.in commodity price API.
+
+Serves records from commodity_price.csv in the same JSON shape as the real
+resource, honouring the filters[...] and limit parameters, with optional
+artificial latency and error rate. Used to test marketbest offline:
+
+    python mock_data_gov_server.py --port 8765 --latency 0.2
+    DATA_GOV_API_URL=http://127.0.0.1:8765/resource DATA_GOV_API_KEY=test streamlit run login.py
+"""
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV = os.path.join(BASE_DIR, "commodity_price.csv")
+
+# CSV header -> field names used by the real API
+FIELD_NAMES = {
+    "Min_x0020_Price": "min_price",
+    "Max_x0020_Price": "max_price",
+    "Modal_x0020_Price": "modal_price",
+}
+
+def load_records(path=DEFAULT_CSV):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [{FIELD_NAMES.get(k, k.lower()): v for k, v in row.items()} for row in csv.DictReader(f)]
+
+def filter_records(records, query):
+    """
+    Applies data.gov.in style filters[field] / filters[field.keyword] params.
+    """
+    filters = {}
+    for key, values in query.items():
+        if key.startswith("filters[") and key.endswith("]"):
+            field = key[len("filters["):-1].replace(".keyword", "")
+            filters[field] = values[0]
+    matched = [r for r in records if all(r.get(f) == v for f, v in filters.items())]
+    limit = int(query.get("limit", ["10"])[0])
+    return matched[:limit]
+
+def make_handler(records, latency=0.0, error_rate=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            if error_rate and random.random() < error_rate:
+                self.send_error(503, "Simulated upstream failure")
+                return
+            query = parse_qs(urlparse(self.path).query)
+            matched = filter_records(records, query)
+            body = json.dumps({"records": matched, "count": len(matched)}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def start_server(port=0, latency=0.0, error_rate=0.0, csv_path=DEFAULT_CSV):
+    """
+    Starts the stand-in server on a background thread.
+    Returns (server, base_url); call server.shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(load_records(csv_path), latency, error_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/resource"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the data.gov.in price API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.port, args.latency, args.error_rate, args.csv)
+    print(f"Serving {args.csv} at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,93 @@
+import os
+import re
+import json
+import hashlib
+import joblib
+
+# --- Registry Location ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_PATH = os.getenv("MODEL_REGISTRY_PATH", os.path.join(BASE_DIR, "models"))
+MANIFEST_FILE = "manifest.json"
+
+# --- Keys and Paths ---
+def series_key(commodity, market):
+    return f"{commodity}|{market}"
+
+def model_filename(commodity, market):
+    """
+    Builds a filesystem-safe, collision-free file name for one series.
+    Agmarknet names contain spaces, brackets and slashes, so a readable slug
+    is combined with a short hash of the exact key.
+    """
+    key = series_key(commodity, market)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", key).strip("_")[:60]
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+    return f"{slug}-{digest}.joblib"
+
+def manifest_path(registry_path=REGISTRY_PATH):
+    return os.path.join(registry_path, MANIFEST_FILE)
+
+# --- Writing ---
+def save_model(results, commodity, market, registry_path=REGISTRY_PATH):
+    """
+    Dumps one fitted model uncompressed, so its arrays can later be
+    memory-mapped instead of copied into each worker's memory.
+    Returns the file name relative to the registry.
+    """
+    os.makedirs(registry_path, exist_ok=True)
+    filename = model_filename(commodity, market)
+    tmp_path = os.path.join(registry_path, filename + ".tmp")
+    joblib.dump(results, tmp_path)
+    os.replace(tmp_path, os.path.join(registry_path, filename))
+    return filename
+
+def write_manifest(entries, registry_path=REGISTRY_PATH):
+    """
+    Atomically replaces the manifest. `entries` maps series_key -> metadata dict
+    (commodity, market, state, file, order, n_obs, last_date, last_value).
+    """
+    os.makedirs(registry_path, exist_ok=True)
+    path = manifest_path(registry_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"series": entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# --- Reading ---
+_manifest_cache = {}
+
+def load_manifest(registry_path=REGISTRY_PATH):
+    """
+    Returns the series entries from the manifest, re-reading the file only
+    when it has changed on disk.
+    """
+    path = manifest_path(registry_path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    cached = _manifest_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f).get("series", {})
+    _manifest_cache[path] = (mtime, entries)
+    return entries
+
+def get_entry(commodity, market, registry_path=REGISTRY_PATH):
+    return load_manifest(registry_path).get(series_key(commodity, market))
+
+def load_model(commodity, market, registry_path=REGISTRY_PATH):
+    """
+    Loads a single series model on demand. The arrays inside the pickle are
+    memory-mapped copy-on-write ("c"), so pages only pay for the models they
+    touch and the statespace filters can still write to their buffers.
+    Returns None if the series has no trained model.
+    """
+    entry = get_entry(commodity, market, registry_path)
+    if entry is None:
+        return None
+    path = os.path.join(registry_path, entry["file"])
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path, mmap_mode="c")
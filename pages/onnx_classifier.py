@@ -0,0 +1,58 @@
+import os
+import json
+import numpy as np
+import onnxruntime as ort
+from types import SimpleNamespace
+
+# No torch or transformers here: a worker running an ONNX runtime only needs
+# onnxruntime and numpy.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join(BASE_DIR, "onnx_model"))
+ONNX_FILES = {
+    "onnx-fp32": "crop_disease_model.onnx",
+    "onnx-int8": "crop_disease_model.int8.onnx",
+}
+
+
+class OnnxClassifier:
+    """
+    Runs an ONNX export of the leaf disease ViT (see convert.py) through
+    onnxruntime on CPU. It mimics the small part of the transformers model
+    interface the analyzer uses: `config.id2label` and `model(pixel_values=...).logits`.
+    Logits come back as a numpy array; `framework` tells the analyzer so.
+    """
+    framework = "np"
+
+    def __init__(self, model_path, config, num_threads=None):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.config = config
+
+    def __call__(self, pixel_values, **kwargs):
+        if hasattr(pixel_values, "numpy"):  # a torch tensor, e.g. from compare_runtimes.py
+            pixel_values = pixel_values.numpy()
+        logits = self.session.run(["logits"], {"pixel_values": np.asarray(pixel_values, dtype=np.float32)})[0]
+        return SimpleNamespace(logits=logits)
+
+
+def load_label_config(model_dir=ONNX_MODEL_DIR):
+    """
+    Reads id2label from the config.json that convert.py saves next to the graphs.
+    """
+    with open(os.path.join(model_dir, "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    return SimpleNamespace(id2label={int(k): v for k, v in config["id2label"].items()})
+
+
+def load_onnx_classifier(runtime="onnx-int8", model_dir=ONNX_MODEL_DIR, num_threads=None):
+    """
+    Loads the exported graph for `runtime` ("onnx-int8" or "onnx-fp32").
+    """
+    model_path = os.path.join(model_dir, ONNX_FILES[runtime])
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"{model_path} not found. Run `python convert.py` first.")
+    return OnnxClassifier(model_path, load_label_config(model_dir), num_threads=num_threads)
@@ -0,0 +1,235 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pandas.api.indexers import BaseIndexer
+
+import price_store
+
+# --- Aggregate Store Location ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGGREGATES_PATH = os.getenv("PRICE_AGGREGATES_PATH", os.path.join(BASE_DIR, "price_aggregates"))
+
+PARTITION_COLS = price_store.PARTITION_COLS
+SERIES_COLS = PARTITION_COLS + ["Market"]
+SHORT_WINDOW = "7D"
+LONG_WINDOW = "30D"
+
+def default_path(store_path=price_store.STORE_PATH):
+    """
+    Where the aggregates of a price store live: AGGREGATES_PATH for the
+    default store, a sibling "<store>_aggregates" directory for any other.
+    """
+    if os.path.abspath(store_path) == os.path.abspath(price_store.STORE_PATH):
+        return AGGREGATES_PATH
+    return os.path.abspath(store_path).rstrip(os.sep) + "_aggregates"
+
+# --- Daily Rows ---
+def daily_prices(df):
+    """
+    Collapses raw price rows (several varieties and grades per market and
+    day) to one row per (State, Commodity, Market, Arrival_Date): lowest
+    min, highest max and mean modal price. Sorted by series, then date.
+    """
+    df = df.reset_index()
+    agg = {"Modal_Price": "mean"}
+    if "Min_Price" in df.columns:
+        agg["Min_Price"] = "min"
+    if "Max_Price" in df.columns:
+        agg["Max_Price"] = "max"
+    if "District" in df.columns:
+        agg["District"] = "last"
+    daily = df.groupby(SERIES_COLS + ["Arrival_Date"], observed=True).agg(agg).reset_index()
+    for col in ("Min_Price", "Max_Price"):
+        if col not in daily.columns:
+            daily[col] = daily["Modal_Price"]
+    # Plain strings, so each series is one contiguous block after sorting.
+    for col in SERIES_COLS + (["District"] if "District" in daily.columns else []):
+        daily[col] = daily[col].astype(str)
+    return daily.sort_values(SERIES_COLS + ["Arrival_Date"], ignore_index=True)
+
+def _recent_history(daily, since):
+    """
+    Keeps the rows a rolling window ending on or after `since` can see:
+    the last LONG_WINDOW before it, plus each series' previous arrival for
+    the first log return.
+    """
+    start = since - pd.Timedelta(LONG_WINDOW)
+    recent = daily["Arrival_Date"] > start
+    anchors = daily[~recent].groupby(SERIES_COLS, sort=False).tail(1).index
+    return daily[recent | daily.index.isin(anchors)].reset_index(drop=True)
+
+# --- Rolling Aggregates ---
+class _SeriesWindow(BaseIndexer):
+    """
+    Precomputed window bounds for rows sorted by (series, date); lets one
+    ungrouped rolling pass stay within each row's own series.
+    """
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        return self.start, self.end
+
+def _calendar_window(series_id, dates, window):
+    """
+    Window covering (date - window, date] of the same series for every row.
+    Series are laid end to end on one day axis, spaced further apart than
+    the window, so a single searchsorted finds every window start.
+    """
+    days = dates.to_numpy().astype("datetime64[D]").astype(np.int64)
+    days = days - days.min() if len(days) else days
+    window_days = pd.Timedelta(window).days
+    keys = series_id * (days.max(initial=0) + window_days + 1) + days
+    start = np.searchsorted(keys, keys - window_days, side="right")
+    return _SeriesWindow(start=start.astype(np.int64), end=np.arange(1, len(keys) + 1, dtype=np.int64))
+
+def compute_aggregates(df, since=None):
+    """
+    Computes the per (State, Commodity, Market, day) aggregate rows: the
+    day's modal price (the latest known price as of that row), rolling 7/30
+    day mean modal price, 30 day volatility (std of log returns between
+    arrivals), 30 day low/high and the day's min-max spread. Windows are
+    calendar based, so gaps between arrivals are respected. Every series
+    is rolled in one vectorized pass. With `since`, only rows from that
+    date on are computed, from the last 30 days of history before it.
+    """
+    daily = daily_prices(df)
+    if since is not None:
+        daily = _recent_history(daily, since)
+    if daily.empty:
+        return pd.DataFrame()
+
+    keys = daily[SERIES_COLS]
+    first_of_series = (keys != keys.shift()).any(axis=1).to_numpy()
+    series_id = np.cumsum(first_of_series)
+    short = _calendar_window(series_id, daily["Arrival_Date"], SHORT_WINDOW)
+    long = _calendar_window(series_id, daily["Arrival_Date"], LONG_WINDOW)
+
+    modal = daily["Modal_Price"]
+    log_returns = np.log(modal.where(modal > 0)).diff().mask(first_of_series)
+
+    result = daily[SERIES_COLS + ["Arrival_Date", "Modal_Price", "Min_Price", "Max_Price"]].copy()
+    result["District"] = daily["District"] if "District" in daily.columns else None
+    result["Mean_7d"] = modal.rolling(short, min_periods=1).mean()
+    result["Mean_30d"] = modal.rolling(long, min_periods=1).mean()
+    result["Low_30d"] = daily["Min_Price"].rolling(long, min_periods=1).min()
+    result["High_30d"] = daily["Max_Price"].rolling(long, min_periods=1).max()
+    result["Volatility_30d"] = log_returns.rolling(long, min_periods=2).std()
+    result["Observations_30d"] = modal.rolling(long, min_periods=0).count().astype("int32")
+    result["Spread"] = result["Max_Price"] - result["Min_Price"]
+    result["Spread_Pct"] = result["Spread"] / result["Modal_Price"]
+    if since is not None:
+        result = result[result["Arrival_Date"] >= since]
+    return result.reset_index(drop=True)
+
+# --- Incremental Refresh ---
+def _write(result, aggregates_path):
+    table = pa.Table.from_pandas(result, preserve_index=False)
+    ds.write_dataset(
+        table,
+        aggregates_path,
+        format="parquet",
+        partitioning=PARTITION_COLS,
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+    )
+
+def _partition_filter(partitions):
+    states = sorted({str(state) for state, _ in partitions})
+    commodities = sorted({str(commodity) for _, commodity in partitions})
+    return ds.field("State").isin(states) & ds.field("Commodity").isin(commodities)
+
+def update(partitions, store_path=price_store.STORE_PATH, aggregates_path=None, history=None, since=None):
+    """
+    Recomputes the aggregates of the given (State, Commodity) partitions and
+    replaces only those partitions of the aggregate store. Called by
+    price_store.ingest/append with the partitions they touched and the rows
+    they already hold (`history`, the full touched partitions); without it
+    the partitions are read from the store in one scan.
+    With `since` (the earliest new arrival date), rows before it are kept
+    from the existing aggregates and only the rest is recomputed.
+    Returns the number of aggregate rows written.
+    """
+    partitions = list(partitions)
+    aggregates_path = aggregates_path or default_path(store_path)
+    if not partitions:
+        return 0
+    if history is None:
+        history = price_store.load_partitions(partitions, store_path=store_path)
+
+    result = compute_aggregates(history, since=since)
+    if since is not None and aggregates_exist(aggregates_path):
+        kept = _dataset(aggregates_path).to_table(
+            filter=_partition_filter(partitions) & (ds.field("Arrival_Date") < pa.scalar(since, pa.timestamp("ns")))
+        ).to_pandas()
+        # The isin filter reads the State x Commodity cross product; keep the requested pairs.
+        touched = pd.MultiIndex.from_tuples([(str(s), str(c)) for s, c in partitions])
+        kept = kept[pd.MultiIndex.from_arrays([kept["State"].astype(str), kept["Commodity"].astype(str)]).isin(touched)]
+        if not kept.empty:
+            result = pd.concat([kept[result.columns], result], ignore_index=True)
+    if result.empty:
+        return 0
+    _write(result, aggregates_path)
+    return len(result)
+
+def rebuild(store_path=price_store.STORE_PATH, aggregates_path=None):
+    """
+    Recomputes every partition, e.g. after the aggregate definitions changed.
+    """
+    partitions = price_store.list_partitions(store_path).itertuples(index=False)
+    return update(list(partitions), store_path, aggregates_path)
+
+def aggregates_exist(aggregates_path=AGGREGATES_PATH):
+    return os.path.isdir(aggregates_path) and any(os.scandir(aggregates_path))
+
+def version(aggregates_path=AGGREGATES_PATH):
+    """
+    Changes whenever an aggregate partition is rewritten; used as a cache key.
+    """
+    return price_store.version(aggregates_path)
+
+# --- Queries ---
+def _dataset(aggregates_path):
+    return ds.dataset(aggregates_path, format="parquet", partitioning="hive")
+
+def load_aggregates(state=None, commodity=None, market=None, aggregates_path=AGGREGATES_PATH):
+    dataset = _dataset(aggregates_path)
+    expr = None
+    for col, value in (("State", state), ("Commodity", commodity), ("Market", market)):
+        if value is not None:
+            cond = ds.field(col) == value
+            expr = cond if expr is None else expr & cond
+    return dataset.to_table(filter=expr).to_pandas()
+
+def best_markets(commodity, state="Kerala", max_age_days=None, aggregates_path=AGGREGATES_PATH):
+    """
+    Ranks every market of a State/Commodity by its latest modal price, in one
+    partition read. Each market's most recent aggregate row is used; with
+    max_age_days, markets whose last arrival is older than that (relative to
+    the newest arrival in the partition) are dropped.
+    Returns a DataFrame indexed by Market, best price first.
+    """
+    df = load_aggregates(state=state, commodity=commodity, aggregates_path=aggregates_path)
+    if df.empty:
+        return df
+    latest = df.sort_values("Arrival_Date").groupby("Market", observed=True).tail(1)
+    if max_age_days is not None:
+        cutoff = latest["Arrival_Date"].max() - pd.Timedelta(days=max_age_days)
+        latest = latest[latest["Arrival_Date"] >= cutoff]
+    latest = latest.sort_values("Modal_Price", ascending=False)
+    latest["Market"] = latest["Market"].astype(str)
+    return latest.set_index("Market")
+
+def list_commodities(state="Kerala", aggregates_path=AGGREGATES_PATH):
+    """
+    Returns the commodities with aggregates for a state; only the partition
+    column is read.
+    """
+    dataset = _dataset(aggregates_path)
+    table = dataset.to_table(columns=["Commodity"], filter=ds.field("State") == state)
+    return sorted(set(table.column("Commodity").to_pylist()))
+
+
+if __name__ == "__main__":
+    # Usage: python price_aggregates.py   (rebuilds every partition from the price store)
+    rows = rebuild()
+    print(f"Wrote {rows} aggregate rows to {AGGREGATES_PATH}")
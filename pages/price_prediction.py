@@ -1,70 +1,201 @@
+import io
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.figure import Figure
 
-# --- Data Fetching Function (MODIFIED to use Sample Data) ---
+import price_store
+import model_registry
+import batch_forecast
+from downsampling import downsample
+
+FORECAST_DAYS = 7
+
+# --- Chart Settings ---
+FIG_SIZE = (9, 4)
+CHART_DPI = 100
+# Roughly the width of the plot area in pixels: more points than this cannot be told apart.
+PIXEL_BUDGET = int(FIG_SIZE[0] * CHART_DPI * 0.85)
+MARKER_MAX_POINTS = 90  # draw point markers only while they stay readable
+CHART_RANGES = {"30 days": 30, "1 year": 365, "All": None}
+
+# --- Data Fetching Function (reads the Kerala slice of the price store) ---
 @st.cache_data
-def get_price_data(crop, market):
-    seed_value = (hash(crop) + hash(market)) % (2**32)
-    np.random.seed(seed_value)
-
-    today = pd.Timestamp.today()
-    dates = pd.date_range(end=today, periods=30, freq='D')
-    
-    base_price = np.random.randint(2000, 5000)
-    price_fluctuations = np.random.randint(-150, 155, size=30).cumsum()
-    prices = base_price + price_fluctuations
-
-    df = pd.DataFrame({'date': dates, 'price': prices})
+def get_price_data(crop, market, data_version=None):
+    # data_version is only part of the cache key, so re-ingested history is picked up.
+    if not price_store.store_exists():
+        return None
+    try:
+        history = price_store.load_slice(state="Kerala", commodity=crop, market=market, columns=["Modal_Price"])
+    except Exception:
+        return None
+    if history.empty:
+        return None
+
+    history = history.reset_index()
+    df = history.groupby("Arrival_Date")["Modal_Price"].mean().reset_index()
+    df.columns = ["date", "price"]
     return df
 
+# --- Forecast from the trained model registry ---
+@st.cache_resource(max_entries=16)
+def get_model(crop, market, model_version):
+    # Only the selected series is loaded (memory-mapped), never the whole registry.
+    # model_version is part of the cache key, so a retrained model is reloaded.
+    return model_registry.load_model(crop, market)
+
+def get_model_version(crop, market):
+    """
+    Returns (file, mtime) of the series' registry entry, or None without one.
+    Changes whenever train.py (or train.py --update) rewrites the model.
+    """
+    entry = model_registry.get_entry(crop, market)
+    if entry is None:
+        return None
+    path = os.path.join(model_registry.REGISTRY_PATH, entry["file"])
+    return entry["file"], os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+@st.cache_data
+def get_forecast_board(board_mtime):
+    # board_mtime is part of the cache key, so a new morning board is picked up.
+    return batch_forecast.load_board()
+
+def get_board_forecast(crop, market):
+    if not os.path.exists(batch_forecast.BOARD_PATH):
+        return None
+    board = get_forecast_board(os.path.getmtime(batch_forecast.BOARD_PATH))
+    rows = board[(board["State"] == "Kerala") & (board["Commodity"] == crop) & (board["Market"] == market)]
+    if rows.empty:
+        return None
+    return rows[["date", "price", "lower", "upper"]].reset_index(drop=True)
+
+def get_forecast(crop, market, periods=FORECAST_DAYS):
+    model = get_model(crop, market, get_model_version(crop, market))
+    if model is None:
+        # No per-series model: fall back to the precomputed Holt forecast board.
+        return get_board_forecast(crop, market)
+    forecast = model.get_forecast(periods)
+    interval = forecast.conf_int()
+    return pd.DataFrame({
+        "date": forecast.predicted_mean.index,
+        "price": forecast.predicted_mean.values,
+        "lower": interval.iloc[:, 0].values,
+        "upper": interval.iloc[:, 1].values,
+    })
+
+def get_available_series():
+    """
+    Returns {crop: [markets]} for the Kerala series that have a trained model
+    or an entry on the forecast board.
+    """
+    available = {}
+    if os.path.exists(batch_forecast.BOARD_PATH):
+        board = get_forecast_board(os.path.getmtime(batch_forecast.BOARD_PATH))
+        kerala = board.loc[board["State"] == "Kerala", ["Commodity", "Market"]].drop_duplicates()
+        for crop, market in kerala.itertuples(index=False):
+            available.setdefault(str(crop), []).append(str(market))
+    for entry in model_registry.load_manifest().values():
+        if entry.get("state") == "Kerala":
+            available.setdefault(entry["commodity"], []).append(entry["market"])
+    return {crop: sorted(set(markets)) for crop, markets in sorted(available.items())}
+
+def data_version():
+    """
+    Changes whenever the price history, the forecast board or the model
+    registry is rewritten; part of every cached chart's key.
+    """
+    board = batch_forecast.BOARD_PATH
+    manifest = model_registry.manifest_path()
+    return (
+        price_store.version() if price_store.store_exists() else 0.0,
+        os.path.getmtime(board) if os.path.exists(board) else 0.0,
+        os.path.getmtime(manifest) if os.path.exists(manifest) else 0.0,
+    )
+
+# --- Chart Rendering ---
+def select_range(price_data, days):
+    if days is None or price_data.empty:
+        return price_data
+    start = price_data["date"].iloc[-1] - pd.Timedelta(days=days - 1)
+    return price_data[price_data["date"] >= start]
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_price_chart(crop, market, range_label, version):
+    """
+    Draws history (LTTB-downsampled to the pixel budget) plus the forecast
+    and returns the chart as PNG bytes, or None without data.
+    Cached by (crop, market, range, data version), so reruns and switching
+    back to a series reuse the image instead of re-plotting.
+    """
+    price_data = get_price_data(crop, market, version)
+    forecast = get_forecast(crop, market)
+    if price_data is None or price_data.empty or forecast is None:
+        return None
+
+    history = select_range(price_data, CHART_RANGES[range_label])
+    current_price = price_data["price"].iloc[-1]
+    plotted = downsample(history, PIXEL_BUDGET)
+
+    # A standalone Figure, not pyplot: no global state shared between sessions.
+    fig = Figure(figsize=FIG_SIZE, dpi=CHART_DPI)
+    ax = fig.subplots()
+    ax.plot(plotted["date"], plotted["price"], label="Historical Prices", color="blue",
+            marker="." if len(plotted) <= MARKER_MAX_POINTS else None, linewidth=1)
+    ax.plot(forecast["date"], forecast["price"].values, label="Predicted Prices", color="orange", linestyle="--", marker="o")
+    ax.fill_between(forecast["date"], forecast["lower"], forecast["upper"], color="orange", alpha=0.2, label="Forecast Interval")
+    ax.axhline(y=current_price, color="green", linestyle=":", label=f"Latest Price: ₹{current_price:,.0f}")
+
+    span_days = (forecast["date"].iloc[-1] - history["date"].iloc[0]).days
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%b %d" if span_days <= 180 else "%b %Y"))
+    ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=10))
+    fig.autofmt_xdate()
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price (₹/quintal)")
+    ax.set_title(f"{crop} Prices in {market}")
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.6)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=CHART_DPI)
+    return buffer.getvalue()
+
 
 # ✅ WRAP EVERYTHING IN show_page() FUNCTION
 def show_page():
     st.header("📊 Crop Price Prediction")
     st.write("Select a crop and market to view current price, trends, and predictions.")
 
-    crops = ["Paddy(Dhan)(Common)", "Coconut", "Banana", "Black Pepper", "Ginger","Carrot" ,"Rubber"]
-    markets = ["Thiruvananthapuram", "Kochi", "Kozhikode", "Thrissur", "Palakkad","Kottayam"]
+    available = get_available_series()
+    if not available:
+        st.warning("No price forecasts found. Run `python train.py` or `python pages/batch_forecast.py` to build them.")
+        return
 
-    selected_crop = st.selectbox("Select Crop", crops)
-    selected_market = st.selectbox("Select Market", markets)
+    selected_crop = st.selectbox("Select Crop", list(available))
+    selected_market = st.selectbox("Select Market", available.get(selected_crop, []))
 
     if selected_crop and selected_market:
         st.subheader(f"📈 Price Analysis for {selected_crop} in {selected_market}")
+        selected_range = st.radio("Range", list(CHART_RANGES), index=len(CHART_RANGES) - 1, horizontal=True)
+
+        version = data_version()
+        price_data = get_price_data(selected_crop, selected_market, version)
+        forecast = get_forecast(selected_crop, selected_market)
+
+        if price_data is not None and not price_data.empty and forecast is not None:
+            current_price = price_data['price'].iloc[-1]
+            predicted_prices = forecast['price'].values
 
-        price_data = get_price_data(selected_crop, selected_market)
-
-        if price_data is not None and not price_data.empty:
-            days = price_data['date']
-            historical_prices = price_data['price']
-            current_price = historical_prices.iloc[-1]
-            
-            future_days = pd.date_range(start=days.iloc[-1] + pd.Timedelta(days=1), periods=7)
-            predicted_prices = np.linspace(current_price, current_price + np.random.randint(-200, 300), 7)
-
-            fig, ax = plt.subplots(figsize=(9,4))
-            ax.plot(days, historical_prices, label="Historical Prices", color="blue", marker='.')
-            ax.plot(future_days, predicted_prices, label="Predicted Prices", color="orange", linestyle="--", marker="o")
-            ax.axhline(y=current_price, color="green", linestyle=":", label=f"Latest Price: ₹{current_price}")
-            
-            ax.xaxis.set_major_formatter(mdates.DateFormatter("%b %d"))
-            ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=10))
-            fig.autofmt_xdate()
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Price (₹/quintal)")
-            ax.set_title(f"{selected_crop} Prices in {selected_market}")
-            ax.legend()
-            ax.grid(True, linestyle='--', alpha=0.6)
-            st.pyplot(fig)
+            st.image(render_price_chart(selected_crop, selected_market, selected_range, version))
 
             st.markdown("### 📌 Forecast Summary")
             st.info(f"""
-            - **Latest Price:** ₹{current_price}
+            - **Latest Price:** ₹{current_price:,.0f}
             - **Predicted Price Range (Next 7 Days):** ₹{int(predicted_prices.min())} – ₹{int(predicted_prices.max())}
             - **Trend:** {"The price is expected to rise slightly in the coming week." if predicted_prices[-1] > current_price else "The price trend appears to be stable or slightly decreasing."}
             """)
+        else:
+            st.warning(f"No price history or trained model for {selected_crop} in {selected_market}.")
     else:
         st.warning("👆 Please select both a crop and a market to see the price prediction.")
@@ -0,0 +1,245 @@
+import os
+import sys
+from urllib.parse import quote, unquote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# --- Store Location ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_PATH = os.getenv("PRICE_STORE_PATH", os.path.join(BASE_DIR, "price_store"))
+DEFAULT_SOURCE = os.path.join(BASE_DIR, "commodity_price.csv")
+
+PARTITION_COLS = ["State", "Commodity"]
+INDEX_COLS = ["Market", "Arrival_Date"]
+CATEGORICAL_COLS = ["State", "District", "Market", "Commodity", "Variety", "Grade"]
+PRICE_COLS = ["Min_Price", "Max_Price", "Modal_Price"]
+
+# Agmarknet exports (CSV and Excel) mangle the header in a few known ways.
+COLUMN_ALIASES = {
+    "Commodi": "Commodity",
+    "Min_x0020_Price": "Min_Price",
+    "Max_x0020_Price": "Max_Price",
+    "Modal_x0020_Price": "Modal_Price",
+    "ModalPrice": "Modal_Price",
+    "al_Date": "Arrival_Date",
+    "Date_x0020": "Arrival_Date",
+    "Date": "Arrival_Date",
+}
+
+# --- Schema Normalization ---
+def normalize_schema(df):
+    """
+    Renames the known column variants to one canonical schema, parses the
+    dd/mm/yyyy arrival dates and converts the text columns to categoricals.
+    """
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if k in df.columns})
+
+    missing = [c for c in PARTITION_COLS + INDEX_COLS + ["Modal_Price"] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Price data is missing required columns: {missing}")
+
+    df["Arrival_Date"] = pd.to_datetime(df["Arrival_Date"], format="%d/%m/%Y", errors="coerce")
+    for col in PRICE_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().astype("category")
+
+    return df.dropna(subset=["Arrival_Date", "Modal_Price"])
+
+def read_source(path):
+    """
+    Reads a raw Agmarknet export (.csv or .xlsx) with every column as text,
+    so nothing is guessed before normalize_schema runs.
+    """
+    if path.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str)
+    return normalize_schema(df)
+
+# --- Ingestion ---
+DEDUP_COLS = ["State", "District", "Market", "Commodity", "Variety", "Grade", "Arrival_Date"]
+
+def _write_partitions(df, store_path):
+    """
+    Writes df to the store. Only the State/Commodity partitions present in
+    df are replaced; all other partitions are left as they are.
+    """
+    df = df.sort_values(PARTITION_COLS + INDEX_COLS)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table,
+        store_path,
+        format="parquet",
+        partitioning=PARTITION_COLS,
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+    )
+
+def ingest(source=DEFAULT_SOURCE, store_path=STORE_PATH, aggregates_path=None):
+    """
+    Normalizes a raw export once and writes it to the columnar store,
+    partitioned by State/Commodity. Partitions touched by this export are
+    replaced. Returns the normalized DataFrame.
+    """
+    df = read_source(source)
+    _write_partitions(df, store_path)
+    _update_aggregates(df, store_path, aggregates_path)
+    return df
+
+def append(source, store_path=STORE_PATH, aggregates_path=None):
+    """
+    Merges a new export (e.g. one day of arrivals) into the store. Each
+    touched partition is read, combined with the new rows (new rows win on
+    duplicates) and rewritten; untouched partitions are never read.
+    Returns only the new, normalized rows.
+    """
+    new_rows = read_source(source)
+    if not store_exists(store_path):
+        _write_partitions(new_rows, store_path)
+        _update_aggregates(new_rows, store_path, aggregates_path)
+        return new_rows
+
+    touched = list(new_rows[PARTITION_COLS].drop_duplicates().itertuples(index=False))
+    existing = load_partitions(touched, store_path=store_path).reset_index()
+    combined = pd.concat([existing, new_rows], ignore_index=True)
+    dedup_cols = [c for c in DEDUP_COLS if c in combined.columns]
+    combined = combined.drop_duplicates(subset=dedup_cols, keep="last")
+    for col in CATEGORICAL_COLS:
+        if col in combined.columns:
+            combined[col] = combined[col].astype(str).astype("category")
+    _write_partitions(combined, store_path)
+    # Only days from the earliest new arrival on can change.
+    _update_aggregates(combined, store_path, aggregates_path, since=new_rows["Arrival_Date"].min())
+    return new_rows
+
+def _update_aggregates(df, store_path, aggregates_path=None, since=None):
+    """
+    Refreshes the materialized aggregates (price_aggregates.py) of the
+    State/Commodity partitions present in df, which holds those partitions'
+    full rows, so nothing is read back from the store.
+    """
+    import price_aggregates  # imports this module, so not at the top
+    partitions = df[PARTITION_COLS].drop_duplicates().itertuples(index=False)
+    price_aggregates.update(list(partitions), store_path=store_path, aggregates_path=aggregates_path,
+                            history=df, since=since)
+
+def store_exists(store_path=STORE_PATH):
+    return os.path.isdir(store_path) and any(os.scandir(store_path))
+
+def version(store_path=STORE_PATH):
+    """
+    Latest modification time of the files under store_path. It changes
+    whenever a partition is rewritten, so it can serve as a cache key.
+    """
+    latest = 0.0
+    for root, _, files in os.walk(store_path):
+        for name in files:
+            latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+    return latest
+
+def _dataset(store_path):
+    return ds.dataset(store_path, format="parquet", partitioning="hive")
+
+def partition_dir(state, commodity, store_path=STORE_PATH):
+    """
+    Directory of one State/Commodity partition, with the values escaped
+    the way write_dataset names hive directories ("Tamil%20Nadu").
+    """
+    return os.path.join(store_path, f"State={quote(str(state), safe='')}",
+                        f"Commodity={quote(str(commodity), safe='')}")
+
+# --- Slice Loading ---
+def load_slice(state=None, commodity=None, market=None, columns=None, store_path=STORE_PATH):
+    """
+    Loads only the rows for the requested State/Commodity (and optionally Market).
+    With both State and Commodity given, the partition directory is opened
+    directly, so a (Kerala, Coconut) query reads one small file without
+    discovering the rest of the store; other queries prune by partition filter.
+    The result is indexed by (Market, Arrival_Date).
+    """
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + INDEX_COLS))
+
+    if state is not None and commodity is not None:
+        df = _load_partition(state, commodity, market, columns, store_path)
+    else:
+        expr = None
+        for col, value in (("State", state), ("Commodity", commodity), ("Market", market)):
+            if value is not None:
+                cond = ds.field(col) == value
+                expr = cond if expr is None else expr & cond
+        df = _dataset(store_path).to_table(columns=columns, filter=expr).to_pandas()
+
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and df[col].dtype != "category":
+            df[col] = df[col].astype("category")
+    return df.set_index(INDEX_COLS).sort_index()
+
+def _load_partition(state, commodity, market, columns, store_path):
+    path = partition_dir(state, commodity, store_path)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns or INDEX_COLS)
+
+    # The partition columns are encoded in the path, not stored in the files.
+    partition_values = {"State": str(state), "Commodity": str(commodity)}
+    file_columns = None if columns is None else [c for c in columns if c not in partition_values]
+    expr = ds.field("Market") == market if market is not None else None
+    df = ds.dataset(path, format="parquet").to_table(columns=file_columns, filter=expr).to_pandas()
+    for col, value in partition_values.items():
+        if columns is None or col in columns:
+            df[col] = value
+    return df
+
+def load_partitions(partitions, columns=None, store_path=STORE_PATH):
+    """
+    Loads the rows of several (State, Commodity) partitions in one scan,
+    indexed like load_slice.
+    """
+    partitions = [(str(state), str(commodity)) for state, commodity in partitions]
+    expr = (ds.field("State").isin(sorted({s for s, _ in partitions}))
+            & ds.field("Commodity").isin(sorted({c for _, c in partitions})))
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + PARTITION_COLS + INDEX_COLS))
+    df = _dataset(store_path).to_table(columns=columns, filter=expr).to_pandas()
+
+    # The isin filter reads the State x Commodity cross product; keep the requested pairs.
+    keys = pd.MultiIndex.from_arrays([df["State"].astype(str), df["Commodity"].astype(str)])
+    df = df[keys.isin(pd.MultiIndex.from_tuples(partitions, names=PARTITION_COLS))]
+    for col in CATEGORICAL_COLS:
+        if col in df.columns and df[col].dtype != "category":
+            df[col] = df[col].astype("category")
+    return df.set_index(INDEX_COLS).sort_index()
+
+def list_partitions(store_path=STORE_PATH):
+    """
+    Returns a DataFrame of the available (State, Commodity) pairs from the
+    directory names alone, without opening any file.
+    """
+    rows = []
+    for state_dir in os.scandir(store_path):
+        if not (state_dir.is_dir() and state_dir.name.startswith("State=")):
+            continue
+        for commodity_dir in os.scandir(state_dir.path):
+            if commodity_dir.is_dir() and commodity_dir.name.startswith("Commodity="):
+                rows.append((unquote(state_dir.name[len("State="):]),
+                             unquote(commodity_dir.name[len("Commodity="):])))
+    return pd.DataFrame(sorted(rows), columns=PARTITION_COLS)
+
+def load_all(columns=None, store_path=STORE_PATH):
+    """
+    Loads the whole store (used by batch jobs such as training).
+    """
+    return load_slice(columns=columns, store_path=store_path)
+
+
+if __name__ == "__main__":
+    # Usage: python price_store.py [export.csv|export.xlsx] [--append]
+    args = [a for a in sys.argv[1:] if a != "--append"]
+    source = args[0] if args else DEFAULT_SOURCE
+    data = append(source) if "--append" in sys.argv else ingest(source)
+    print(f"Ingested {len(data)} rows from {source} into {STORE_PATH}")
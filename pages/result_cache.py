@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from PIL import Image
+
+# --- Cache Location and Limits ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(BASE_DIR, "cache", "leaf_results.sqlite3"))
+MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000"))
+# Hamming distance (out of 64 bits) under which two photos count as the same
+# leaf. 0 disables the near-duplicate lookup; only identical bytes then hit.
+PHASH_MAX_DISTANCE = int(os.getenv("RESULT_CACHE_PHASH_DISTANCE", "0"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    phash INTEGER,
+    result TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+# --- Hashing ---
+def content_hash(image_bytes, namespace=""):
+    """
+    SHA-256 of the raw upload, prefixed with a namespace (the model runtime)
+    so results from different models never mix.
+    """
+    return f"{namespace}:{hashlib.sha256(image_bytes).hexdigest()}"
+
+def perceptual_hash(image):
+    """
+    64-bit difference hash (dHash): compares neighbouring pixels of a 9x8
+    grayscale thumbnail, so re-encoded or slightly resized copies of the same
+    photo land within a few bits of each other.
+    """
+    thumb = image.convert("L").resize((9, 8), Image.BILINEAR)
+    pixels = list(thumb.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    # SQLite integers are signed 64-bit
+    return bits - (1 << 64) if bits >= (1 << 63) else bits
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+class ResultCache:
+    """
+    Bounded, LRU-evicted store of analysis results keyed by image content.
+    Backed by SQLite so every session and worker process shares it.
+    """
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, phash_max_distance=PHASH_MAX_DISTANCE):
+        self.path = path
+        self.max_entries = max_entries
+        self.phash_max_distance = phash_max_distance
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def get_similar(self, phash, namespace=""):
+        """
+        Returns the result of the closest cached image within the distance
+        threshold, or None. Only used when near-duplicate lookup is enabled.
+        """
+        if not self.phash_max_distance or phash is None:
+            return None
+        best = None
+        rows = self._conn().execute(
+            "SELECT key, phash FROM results WHERE phash IS NOT NULL AND key LIKE ?", (f"{namespace}:%",)
+        )
+        for key, other in rows:
+            distance = hamming_distance(phash, other)
+            if distance <= self.phash_max_distance and (best is None or distance < best[0]):
+                best = (distance, key)
+        return self.get(best[1]) if best else None
+
+    def put(self, key, result, phash=None):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO results (key, phash, result, last_used) VALUES (?, ?, ?, ?)",
+            (key, phash, json.dumps(result), time.time()),
+        )
+        # Evict least recently used entries beyond the bound.
+        conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            "SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_cache():
+    """
+    Returns the process-wide result cache instance.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
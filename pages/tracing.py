@@ -0,0 +1,226 @@
+"""
+Lightweight latency tracing, off unless TRACE_PATH is set.
+
+Wrap work in spans; nested spans record their parent, and each finished span
+becomes one JSON line in TRACE_PATH (e.g. TRACE_PATH=cache/traces.jsonl).
+TRACE_SAMPLE_RATE keeps that fraction of traces: the decision is made at the
+root span and inherited by its children, so a kept trace is always complete.
+Lines are buffered and written in batches by a background thread; the file
+rolls over to <TRACE_PATH>.1 past TRACE_MAX_BYTES. Attributes must not carry
+user text: record its length or fingerprint() instead.
+
+    with tracing.span("inference", batch=8):
+        ...
+
+    python tracing.py report [cache/traces.jsonl] [--since-hours 24]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import random
+import hashlib
+import argparse
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TRACE_PATH = os.path.join(BASE_DIR, "cache", "traces.jsonl")
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(50 * 1024 * 1024)))
+FLUSH_INTERVAL = 1.0  # seconds between background flushes
+FLUSH_LINES = 512     # flush early once this many lines are waiting
+
+_current = contextvars.ContextVar("farmhand_span", default=None)
+_buffer = []
+_buffer_lock = threading.Lock()
+_file_lock = threading.Lock()
+_flusher = None
+
+
+def fingerprint(text):
+    """
+    Short stable hash of a string, for correlating spans without storing the text.
+    """
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()[:12]
+
+def flush():
+    """
+    Appends the buffered lines to TRACE_PATH, rotating the file first if it
+    has grown past TRACE_MAX_BYTES (one .1 backup is kept).
+    """
+    global _buffer
+    with _buffer_lock:
+        lines, _buffer = _buffer, []
+    if not lines or not TRACE_PATH:
+        return
+    with _file_lock:
+        os.makedirs(os.path.dirname(TRACE_PATH) or ".", exist_ok=True)
+        try:
+            if os.path.getsize(TRACE_PATH) >= TRACE_MAX_BYTES:
+                os.replace(TRACE_PATH, TRACE_PATH + ".1")
+        except OSError:
+            pass
+        # One write per batch; O_APPEND keeps lines from different processes intact.
+        with open(TRACE_PATH, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError:
+            pass
+
+def _start_flusher():
+    global _flusher
+    with _buffer_lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="trace-flush", daemon=True)
+    _flusher.start()
+    atexit.register(flush)
+
+def _write(record):
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    if _flusher is None:
+        _start_flusher()
+    with _buffer_lock:
+        _buffer.append(line)
+        full = len(_buffer) >= FLUSH_LINES
+    if full:
+        flush()
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times the enclosed block. Attributes and any error are stored with the span.
+    Yields the attribute dict so callers can add results (e.g. hit=True).
+    """
+    parent = _current.get()
+    if not TRACE_PATH or (parent is not None and not parent["sampled"]):
+        yield attributes
+        return
+    span_id = uuid.uuid4().hex[:16]
+    if parent is None:
+        trace_id = span_id
+        sampled = TRACE_SAMPLE_RATE >= 1.0 or random.random() < TRACE_SAMPLE_RATE
+    else:
+        trace_id, sampled = parent["trace_id"], True
+    token = _current.set({"trace_id": trace_id, "span_id": span_id, "sampled": sampled})
+    if not sampled:
+        try:
+            yield attributes
+        finally:
+            _current.reset(token)
+        return
+    start_wall = time.time()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        record = {
+            "name": name,
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": parent["span_id"] if parent else None,
+            "start": round(start_wall, 6),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        if attributes:
+            record["attributes"] = attributes
+        if error:
+            record["error"] = error
+        _write(record)
+
+def propagate(func):
+    """
+    Binds the current span context to func so spans it opens on a worker
+    thread (ThreadPoolExecutor.submit(tracing.propagate(f), ...)) nest under
+    the caller's span.
+    """
+    ctx = contextvars.copy_context()
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A Context can only be entered by one thread at a time, so each call gets its own copy.
+        return ctx.copy().run(func, *args, **kwargs)
+    return wrapper
+
+# --- Report ---
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = (len(sorted_values) - 1) * q
+    lower = int(index)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (index - lower)
+
+def summarize(records):
+    """
+    Returns [{name, count, errors, p50, p95, p99, max}] sorted by total time spent.
+    """
+    by_name = {}
+    for record in records:
+        entry = by_name.setdefault(record["name"], {"durations": [], "errors": 0})
+        entry["durations"].append(record["duration_ms"])
+        entry["errors"] += "error" in record
+
+    rows = []
+    for name, entry in by_name.items():
+        durations = sorted(entry["durations"])
+        rows.append({
+            "name": name,
+            "count": len(durations),
+            "errors": entry["errors"],
+            "p50": round(percentile(durations, 0.50), 2),
+            "p95": round(percentile(durations, 0.95), 2),
+            "p99": round(percentile(durations, 0.99), 2),
+            "max": round(durations[-1], 2),
+            "total": sum(durations),
+        })
+    return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+def read_records(path, since=None):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if since is None or record.get("start", 0) >= since:
+                yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Span latency report.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="p50/p95/p99 latency by span name")
+    report.add_argument("path", nargs="?", default=TRACE_PATH or DEFAULT_TRACE_PATH)
+    report.add_argument("--since-hours", type=float, default=None)
+    report.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    rows = summarize(read_records(args.path, since))
+    if args.json:
+        print(json.dumps([{k: v for k, v in row.items() if k != "total"} for row in rows], indent=2))
+        return
+    print(f"{'span':<36}{'count':>8}{'err':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+    for row in rows:
+        print(f"{row['name']:<36}{row['count']:>8}{row['errors']:>6}"
+              f"{row['p50']:>11.2f}{row['p95']:>11.2f}{row['p99']:>11.2f}{row['max']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
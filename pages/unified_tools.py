@@ -1,8 +1,73 @@
 import os
-import chromadb
-import wikipediaapi
-import google.generativeai as genai
-from googleapiclient.discovery import build
+import threading
+
+import api_cache
+import embedding_cache
+import tracing
+
+# chromadb, google.generativeai, googleapiclient and wikipediaapi are imported
+# inside the functions that use them, so importing this module is cheap.
+
+KNOWLEDGE_BASE_PATH = "agri_db"
+COLLECTION_NAME = "kerala_agri_knowledge"
+EMBEDDING_MODEL = "models/embedding-001"
+# "chroma": remote embeddings + Chroma, falling back to the local index if that fails.
+# "local": offline BM25 (+ optional local embeddings) only, see local_retrieval.py.
+KNOWLEDGE_BACKEND = os.getenv("KNOWLEDGE_BACKEND", "chroma")
+# Open-Meteo endpoints; point them at bench/fake_services.py stand-ins to run offline.
+GEOCODING_URL = os.getenv("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+FORECAST_URL = os.getenv("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+# Seconds any single upstream request may take, so work the agent gave up on still ends.
+HTTP_TIMEOUT = 8
+
+# (fresh seconds, stale-while-revalidate seconds) per tool: web results carry
+# news and prices so they expire quickly; encyclopedic pages barely change.
+TOOL_CACHE_TTLS = {
+    "google_search": (15 * 60, 60 * 60),
+    "search_wikipedia": (7 * 24 * 60 * 60, 30 * 24 * 60 * 60),
+    "get_weather": (30 * 60, 3 * 60 * 60),
+}
+
+_collection = None
+_collection_lock = threading.Lock()
+_clients = threading.local()  # per-thread Google / Wikipedia clients, reused across calls
+
+def get_knowledge_base():
+    """
+    Returns the knowledge base collection, opening the Chroma client once per process.
+    """
+    global _collection
+    with _collection_lock:
+        if _collection is None:
+            import chromadb
+            client = chromadb.PersistentClient(path=KNOWLEDGE_BASE_PATH)
+            _collection = client.get_collection(name=COLLECTION_NAME)
+        return _collection
+
+def reset_knowledge_base():
+    """
+    Drops the shared collection handle, e.g. after the database was rebuilt.
+    """
+    global _collection
+    with _collection_lock:
+        _collection = None
+
+def _remote_embed(text):
+    import google.generativeai as genai
+    result = genai.embed_content(model=EMBEDDING_MODEL, content=text, task_type="retrieval_query",
+                                 request_options={"timeout": HTTP_TIMEOUT})
+    return result['embedding']
+
+def embed_query(query: str):
+    """
+    Returns the retrieval embedding for a query, from the persistent
+    embedding cache when the same (normalized) question was seen before.
+    """
+    def embed(text):
+        with tracing.span("embedding.remote", model=EMBEDDING_MODEL):
+            return _remote_embed(text)
+    with tracing.span("embedding", model=EMBEDDING_MODEL):
+        return embedding_cache.get_cache().get_or_embed(EMBEDDING_MODEL, query, embed)
 
 def query_knowledge_base(query: str) -> str:
     """
@@ -10,43 +75,100 @@ def query_knowledge_base(query: str) -> str:
     including farming techniques, local schemes, and known pest data.
     Use this for questions about established local practices. For example: 'How do I prepare for the Mundakan season?'
     """
-    print(f"--- [Searching internal knowledge base for: {query}] ---")
+    with tracing.span("tool.query_knowledge_base", query_chars=len(query),
+                      query_hash=tracing.fingerprint(query), backend=KNOWLEDGE_BACKEND) as attrs:
+        if KNOWLEDGE_BACKEND != "local":
+            try:
+                collection = get_knowledge_base()
+                query_embedding = embed_query(query)
+                with tracing.span("chroma.query", n_results=2):
+                    results = collection.query(
+                        query_embeddings=[query_embedding],
+                        n_results=2
+                    )
+                return "\n---\n".join(results['documents'][0])
+            except Exception as e:
+                reset_knowledge_base()
+                attrs["fallback"] = f"{type(e).__name__}: {e}"
+        return query_local_index(query)
+
+def query_local_index(query: str, n_results: int = 2) -> str:
+    """
+    Answers from the offline BM25/hybrid index over the knowledge documents.
+    """
     try:
-        client = chromadb.PersistentClient(path="agri_db")
-        collection = client.get_collection(name="kerala_agri_knowledge")
-        
-        query_embedding_result = genai.embed_content(
-            model="models/embedding-001",
-            content=query,
-            task_type="retrieval_query"
-        )
-        results = collection.query(
-            query_embeddings=[query_embedding_result['embedding']],
-            n_results=2
-        )
-        return "\n---\n".join(results['documents'][0])
+        import local_retrieval
+        with tracing.span("local_index.search", n_results=n_results):
+            hits = local_retrieval.search(query, n_results=n_results)
+        if not hits:
+            return "No matching information found in the local knowledge base."
+        return "\n---\n".join(hit["text"] for hit in hits)
     except Exception as e:
         return f"Error accessing the local knowledge base: {e}"
 
+def _google_service():
+    """
+    Builds the Custom Search service once per thread and reuses it; the
+    underlying httplib2 connection is not safe to share between threads.
+    """
+    service = getattr(_clients, "google", None)
+    if service is None:
+        import httplib2
+        from googleapiclient.discovery import build
+        service = build("customsearch", "v1", developerKey=os.getenv("GOOGLE_API_KEY"), cache_discovery=False,
+                        http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        _clients.google = service
+    return service
+
+def _wikipedia_client():
+    wiki_wiki = getattr(_clients, "wikipedia", None)
+    if wiki_wiki is None:
+        import wikipediaapi
+        wiki_wiki = wikipediaapi.Wikipedia(language='en', user_agent='KeralaAgriBot/1.0', timeout=HTTP_TIMEOUT)
+        _clients.wikipedia = wiki_wiki
+    return wiki_wiki
+
+def _cached_tool_call(tool, key, fetch):
+    """
+    Runs fetch() through the shared persistent cache with the tool's TTLs.
+    Returns (result, error); error is set only if nothing could be served.
+    """
+    errors = []
+    def guarded_fetch():
+        try:
+            return fetch()
+        except Exception as e:
+            errors.append(e)
+            raise
+    def traced_fetch():
+        # Only runs on a cache miss or background refresh, so this span is the network time.
+        with tracing.span(f"tool.{tool}.fetch"):
+            return guarded_fetch()
+    ttl, stale_ttl = TOOL_CACHE_TTLS[tool]
+    with tracing.span(f"tool.{tool}", key_hash=tracing.fingerprint(key)):
+        result = api_cache.get_cache().get_or_fetch(tool, key, traced_fetch, ttl=ttl, stale_ttl=stale_ttl)
+    return result, (errors[0] if errors else "no result")
+
+def _normalize(query):
+    return " ".join(query.lower().split())
+
 def google_search(query: str) -> str:
     """
     Performs a Google search for a given query.
     Use this for current events, news, market prices, and general information not found in the local knowledge base.
     For example: 'What is the latest news on rubber prices?'
     """
-    print(f"--- [Performing Google Search for: {query}] ---")
-    try:
-        api_key = os.getenv("GOOGLE_API_KEY")
+    def fetch():
         search_engine_id = os.getenv("SEARCH_ENGINE_ID")
-        service = build("customsearch", "v1", developerKey=api_key)
-        res = service.cse().list(q=query, cx=search_engine_id, num=3).execute()
-        
+        res = _google_service().cse().list(q=query, cx=search_engine_id, num=3).execute()
+
         if 'items' not in res:
             return "No results found."
         snippets = [f"Title: {item['title']}\nSnippet: {item['snippet']}" for item in res['items']]
         return "\n\n".join(snippets)
-    except Exception as e:
-        return f"Error during Google search: {e}"
+
+    result, error = _cached_tool_call("google_search", _normalize(query), fetch)
+    return result if result is not None else f"Error during Google search: {error}"
 
 def search_wikipedia(query: str) -> str:
     """
@@ -54,12 +176,41 @@ def search_wikipedia(query: str) -> str:
     Use this for factual, historical, or encyclopedic information.
     For example: 'What is the scientific name for Black Pepper?'
     """
-    print(f"--- [Searching Wikipedia for: {query}] ---")
-    try:
-        wiki_wiki = wikipediaapi.Wikipedia(language='en', user_agent='KeralaAgriBot/1.0')
-        page = wiki_wiki.page(query)
+    def fetch():
+        page = _wikipedia_client().page(query)
         if not page.exists():
             return f"Wikipedia page for '{query}' not found."
         return ". ".join(page.summary.split('.')[0:3]) + "."
-    except Exception as e:
-        return f"Error during Wikipedia search: {e}"
\ No newline at end of file
+
+    # Titles are case-sensitive beyond the first letter, so only whitespace is normalized.
+    result, error = _cached_tool_call("search_wikipedia", " ".join(query.split()), fetch)
+    return result if result is not None else f"Error during Wikipedia search: {error}"
+
+def get_weather(location: str) -> str:
+    """
+    Gets today's weather and the next 3 days' forecast for a place in Kerala
+    from Open-Meteo (no API key needed).
+    For example: 'Thiruvananthapuram'
+    """
+    def fetch():
+        import requests
+        geo = requests.get(GEOCODING_URL, params={"name": location, "count": 1}, timeout=HTTP_TIMEOUT).json()
+        if not geo.get("results"):
+            return f"Location '{location}' not found."
+        place = geo["results"][0]
+        forecast = requests.get(FORECAST_URL, params={
+            "latitude": place["latitude"],
+            "longitude": place["longitude"],
+            "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
+            "timezone": "Asia/Kolkata",
+            "forecast_days": 4,
+        }, timeout=HTTP_TIMEOUT).json()["daily"]
+        days = [
+            f"{day}: {tmin}-{tmax}°C, rain {rain} mm"
+            for day, tmin, tmax, rain in zip(forecast["time"], forecast["temperature_2m_min"],
+                                             forecast["temperature_2m_max"], forecast["precipitation_sum"])
+        ]
+        return f"Weather for {place['name']}:\n" + "\n".join(days)
+
+    result, error = _cached_tool_call("get_weather", _normalize(location), fetch)
+    return result if result is not None else f"Error fetching weather: {error}"
@@ -0,0 +1,105 @@
+import os
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+
+USER_DB_PATH = os.getenv("USER_DB_PATH", "users.sqlite3")
+LEGACY_USER_FILE = "users.pkl"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class UserStore:
+    """
+    SQLite-backed user accounts. Lookups go through the primary-key index and
+    every signup is a single INSERT in its own transaction, so concurrent
+    signups from several Streamlit workers cannot overwrite each other.
+    WAL mode lets readers continue while a write is in progress.
+    """
+    def __init__(self, path=USER_DB_PATH, legacy_file=LEGACY_USER_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self._migrate_from_pickle(legacy_file)
+        self._ensure_admin()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- One-time setup ---
+    def _migrate_from_pickle(self, legacy_file):
+        """
+        Imports the old pickled {username: sha256 hash} dict exactly once.
+        The meta row is claimed inside the same transaction, so only one
+        process performs the migration.
+        """
+        if not os.path.exists(legacy_file):
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_pickle'").fetchone():
+                conn.execute("COMMIT")
+                return
+            with open(legacy_file, "rb") as f:
+                legacy_users = pickle.load(f)
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                [(username, password_hash, now) for username, password_hash in legacy_users.items()],
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from_pickle', ?)", (str(now),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _ensure_admin(self):
+        # Same default as before: an empty store starts with the admin account.
+        self._conn().execute(
+            "INSERT OR IGNORE INTO users (username, password_hash, created_at) "
+            "SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM users)",
+            ("admin", hashlib.sha256("admin123".encode()).hexdigest(), time.time()),
+        )
+
+    # --- Accounts ---
+    def exists(self, username):
+        return self._conn().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def check_password(self, username, password_hash):
+        row = self._conn().execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None and row[0] == password_hash
+
+    def create_user(self, username, password_hash):
+        """
+        Returns False if the username is already taken (checked atomically by the insert).
+        """
+        try:
+            self._conn().execute(
+                "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                (username, password_hash, time.time()),
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
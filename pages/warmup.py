@@ -0,0 +1,48 @@
+import time
+import threading
+
+_started = False
+_lock = threading.Lock()
+timings = {}  # task name -> seconds (or the error message if it failed)
+
+
+def _warm_disease_model():
+    import disease_analyzer
+    processor, model = disease_analyzer.load_model_and_processor()
+    if model is None:
+        raise RuntimeError("model could not be loaded")
+
+def _warm_knowledge_base():
+    import unified_tools
+    unified_tools.get_knowledge_base()
+
+def _warm_chat_client():
+    import mistralai.client  # noqa: F401  (import cost only; the client needs no network to build)
+
+WARMUP_TASKS = [
+    ("disease_model", _warm_disease_model),
+    ("knowledge_base", _warm_knowledge_base),
+    ("mistral_client", _warm_chat_client),
+]
+
+def _run():
+    for name, task in WARMUP_TASKS:
+        start = time.perf_counter()
+        try:
+            task()
+            timings[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            timings[name] = f"failed: {e}"
+
+def start_warmup():
+    """
+    Preloads the heavy models and clients on a background thread, once per
+    process. Called after login so the first page a user opens is already warm,
+    while the login screen itself never waits for these imports.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_run, name="farmhand-warmup", daemon=True).start()
@@ -0,0 +1,106 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return api_cache.PersistentCache(str(tmp_path / "api_cache.sqlite3"))
+
+
+def test_empty_result_is_cached_negatively(cache):
+    calls = []
+    def fetch():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_fetch("ns", "k", fetch, ttl=60, stale_ttl=120) is None
+    assert cache.get_or_fetch("ns", "k", fetch, ttl=60, stale_ttl=120) is None
+    assert len(calls) == 1
+
+
+def test_negative_result_expires_after_negative_ttl(cache):
+    calls = []
+    def fetch():
+        calls.append(1)
+        return None
+
+    cache.get_or_fetch("ns", "k", fetch, ttl=60, stale_ttl=120, negative_ttl=0)
+    cache.get_or_fetch("ns", "k", fetch, ttl=60, stale_ttl=120, negative_ttl=0)
+    assert len(calls) == 2
+
+
+def test_empty_result_falls_back_to_group(cache):
+    cache.set("ns", "yesterday", {"price": 10}, group="g")
+    assert cache.get_or_fetch("ns", "today", lambda: None, ttl=60, stale_ttl=120, group="g") == {"price": 10}
+
+
+def test_negative_rows_are_not_used_as_fallback(cache):
+    cache.set("ns", "yesterday", None, group="g")
+    assert cache.get_latest_in_group("ns", "g") is None
+
+
+def test_expired_rows_are_purged(cache):
+    cache.set("ns", "old", [1])
+    cache._conn().execute("UPDATE cache SET fetched_at = ?", (time.time() - 1000,))
+    cache.get_or_fetch("ns", "new", lambda: [2], ttl=60, stale_ttl=120)
+    assert cache.get("ns", "old") is None
+    assert cache.get("ns", "new")[0] == [2]
+
+
+def test_purge_is_rate_limited(cache):
+    cache.get_or_fetch("ns", "a", lambda: [1], ttl=60, stale_ttl=120)
+    cache._conn().execute("UPDATE cache SET fetched_at = ?", (time.time() - 1000,))
+    cache.get_or_fetch("ns", "b", lambda: [2], ttl=60, stale_ttl=120)
+    assert cache.get("ns", "a") is not None  # purged at most once per PURGE_INTERVAL
+
+
+def test_fresh_entry_is_served_without_fetching(cache):
+    cache.set("ns", "k", [1])
+    def fetch():
+        raise AssertionError("fresh entries must not be refetched")
+    assert cache.get_or_fetch("ns", "k", fetch, ttl=60, stale_ttl=120) == [1]
+
+
+def test_stale_entry_is_served_while_refreshing(cache):
+    cache.set("ns", "k", [1])
+    cache._conn().execute("UPDATE cache SET fetched_at = ?", (time.time() - 90,))
+
+    assert cache.get_or_fetch("ns", "k", lambda: [2], ttl=60, stale_ttl=120) == [1]
+    deadline = time.time() + 2
+    while cache.get("ns", "k")[0] != [2] and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get("ns", "k")[0] == [2]
+
+
+def test_failed_refresh_keeps_serving_stale_value(cache):
+    cache.set("ns", "k", [1])
+    cache._conn().execute("UPDATE cache SET fetched_at = ?", (time.time() - 90,))
+    def fetch():
+        raise RuntimeError("upstream down")
+
+    assert cache.get_or_fetch("ns", "k", fetch, ttl=60, stale_ttl=120) == [1]
+    time.sleep(0.05)
+    assert cache.get("ns", "k")[0] == [1]
+
+
+def test_concurrent_misses_are_coalesced(cache):
+    calls = []
+    release = threading.Event()
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return [42]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cache.get_or_fetch, "ns", "k", fetch, 60, 120) for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == [[42]] * 8
+    assert len(calls) == 1
@@ -0,0 +1,61 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from batch_forecast import holt_filter
+
+
+def test_constant_series_has_no_trend_or_error():
+    values = np.full((1, 30), 2500.0)
+    level, trend, sse, n_errors = holt_filter(values, 0.5, 0.3)
+    assert level[0] == pytest.approx(2500.0)
+    assert trend[0] == pytest.approx(0.0)
+    assert sse[0] == pytest.approx(0.0)
+    assert n_errors[0] == 29
+
+
+def test_full_smoothing_tracks_a_linear_series():
+    values = (2.0 * np.arange(10))[None, :]
+    level, trend, sse, n_errors = holt_filter(values, 1.0, 1.0)
+    assert level[0] == pytest.approx(18.0)
+    assert trend[0] == pytest.approx(2.0)
+    # Only the first step (flat starting trend) misses: by 2.
+    assert sse[0] == pytest.approx(4.0)
+
+
+def test_rows_are_independent_and_gaps_are_skipped():
+    values = np.array([
+        [np.nan, np.nan, 10.0, 10.0, 10.0],   # starts late
+        [5.0, np.nan, 5.0, np.nan, 5.0],      # gaps leave the state untouched
+        [np.nan] * 5,                          # never observed
+    ])
+    level, trend, sse, n_errors = holt_filter(values, np.array([0.5, 0.5, 0.5]), 0.2)
+    assert level[:2] == pytest.approx([10.0, 5.0])
+    assert list(n_errors) == [2, 2, 0]
+    assert np.isnan(level[2])
+
+
+def test_per_row_parameters_match_separate_runs():
+    rng = np.random.default_rng(0)
+    values = 1000 + rng.normal(0, 20, size=(3, 60)).cumsum(axis=1)
+    alphas, betas = np.array([0.2, 0.5, 0.9]), np.array([0.1, 0.3, 0.05])
+    level, trend, sse, _ = holt_filter(values, alphas, betas)
+    for row in range(3):
+        single = holt_filter(values[row:row + 1], alphas[row], betas[row])
+        assert level[row] == pytest.approx(single[0][0])
+        assert sse[row] == pytest.approx(single[2][0])
+
+
+def test_fit_parameters_picks_the_lowest_error_grid_point():
+    from batch_forecast import fit_parameters, ALPHA_GRID, BETA_GRID
+    rng = np.random.default_rng(1)
+    values = 1000 + rng.normal(0, 20, size=(5, 80)).cumsum(axis=1)
+    values[4] = np.nan  # never observed: keeps the first grid point
+    alpha, beta = fit_parameters(values)
+
+    for row in range(4):
+        errors = {(a, b): holt_filter(values[row:row + 1], a, b)[2][0] for a in ALPHA_GRID for b in BETA_GRID}
+        assert (alpha[row], beta[row]) == min(errors, key=errors.get)
+    assert (alpha[4], beta[4]) == (ALPHA_GRID[0], BETA_GRID[0])
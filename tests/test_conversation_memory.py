@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import pytest
+
+from conversation_memory import (SUMMARY_PREFIX, compact_history, history_tokens, split_turns,
+                                 summarize_turn)
+
+
+def message(role, content):
+    return SimpleNamespace(role=role, content=content, tool_calls=None)
+
+
+def conversation(n_turns, answer_words=300):
+    messages = [message("system", "You are Agri-Bot.")]
+    for i in range(n_turns):
+        messages.append(message("user", f"Question {i} about paddy?"))
+        messages.append(message("assistant", f"Answer {i}. Second sentence. " + "word " * answer_words))
+    return messages
+
+
+def test_split_turns_groups_replies_with_their_question():
+    system, summary, turns = split_turns(conversation(3))
+    assert [m.content for m in system] == ["You are Agri-Bot."]
+    assert summary == []
+    assert [[m.role for m in turn] for turn in turns] == [["user", "assistant"]] * 3
+
+
+def test_summarize_turn_keeps_question_and_answer_start():
+    line = summarize_turn([message("user", "When to sow?"), message("assistant", "In June. Then weed. Later harvest.")])
+    assert line == "- Farmer asked: When to sow? | Answer: In June. Then weed."
+
+
+def test_compact_history_stays_within_budget():
+    pytest.importorskip("mistralai.models.chat_completion")
+    messages = conversation(30)
+    compacted = compact_history(messages, budget=3000, keep_recent=2)
+
+    assert history_tokens(compacted) <= 3000
+    assert compacted[0].content == "You are Agri-Bot."
+    assert compacted[1].role == "system" and compacted[1].content.startswith(SUMMARY_PREFIX)
+    assert [m.content for m in compacted[-4:]] == [m.content for m in messages[-4:]]
+
+
+def test_compaction_is_stable_on_rerun():
+    pytest.importorskip("mistralai.models.chat_completion")
+    once = compact_history(conversation(30))
+    twice = compact_history(once)
+    assert [m.content for m in twice] == [m.content for m in once]
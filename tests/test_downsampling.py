@@ -0,0 +1,40 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from downsampling import lttb_indices, downsample
+
+
+def test_keeps_endpoints_and_point_count():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    indices = lttb_indices(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_keeps_isolated_peaks():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[123], y[377] = 50.0, -40.0
+    indices = lttb_indices(x, y, 20)
+    assert 123 in indices and 377 in indices
+
+
+def test_small_inputs_are_returned_whole():
+    assert list(lttb_indices([0, 1, 2], [1, 2, 3], 10)) == [0, 1, 2]
+    assert list(lttb_indices(range(10), range(10), 2)) == list(range(10))
+
+
+def test_downsample_frame_with_dates():
+    df = pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=400, freq="D"),
+        "price": np.linspace(1000, 2000, 400),
+    })
+    plotted = downsample(df, 50)
+    assert len(plotted) == 50
+    assert plotted["date"].iloc[0] == df["date"].iloc[0]
+    assert plotted["date"].iloc[-1] == df["date"].iloc[-1]
+    assert len(downsample(df.head(30), 50)) == 30
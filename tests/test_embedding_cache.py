@@ -0,0 +1,40 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import embedding_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: float(next(ticks)))
+    return embedding_cache.EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=2)
+
+
+def test_normalized_queries_share_one_embedding(cache):
+    calls = []
+    def embed(text):
+        calls.append(text)
+        return [0.5, 0.25]
+
+    assert cache.get_or_embed("m", "How to grow pepper? ", embed) == [0.5, 0.25]
+    assert cache.get_or_embed("m", "how  to grow PEPPER", embed) == [0.5, 0.25]
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    # Different models never share vectors.
+    cache.get_or_embed("other", "how to grow pepper", embed)
+    assert len(calls) == 2
+
+
+def test_least_recently_used_embedding_is_evicted(cache):
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert cache.get("m", "a") == [1.0]
+
+    cache.put("m", "c", [3.0])
+    assert cache.stats()["entries"] == 2
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0]
@@ -0,0 +1,48 @@
+import io
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+from PIL import Image
+
+from image_preprocessing import CONFIG_PATH, LeafPreprocessor
+
+
+def photo(size=(300, 200), fmt="PNG"):
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+    buf = io.BytesIO()
+    image.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_fused_normalization_matches_rescale_then_normalize():
+    processor = LeafPreprocessor.from_config_file()
+    data = photo()
+    pixel_values = processor(images=[data], return_tensors="np")["pixel_values"]
+
+    expected = np.asarray(Image.open(io.BytesIO(data)).convert("RGB").resize((224, 224), Image.BILINEAR),
+                          dtype=np.float32)
+    expected = ((expected * (1 / 255) - 0.5) / 0.5).transpose(2, 0, 1)
+    assert pixel_values.shape == (1, 3, 224, 224)
+    np.testing.assert_allclose(pixel_values[0], expected, atol=1e-5)
+
+
+def test_matches_the_hugging_face_processor():
+    transformers = pytest.importorskip("transformers")
+    reference = transformers.ViTImageProcessor.from_pretrained(os.path.dirname(CONFIG_PATH))
+    data = photo()
+    expected = reference(images=[Image.open(io.BytesIO(data))], return_tensors="np")["pixel_values"]
+    actual = LeafPreprocessor.from_config_file()(images=[data], return_tensors="np")["pixel_values"]
+    np.testing.assert_allclose(actual, expected, atol=1e-2)
+
+
+def test_batches_reuse_the_buffer_and_keep_their_size():
+    processor = LeafPreprocessor.from_config_file()
+    batch = processor(images=[photo(), photo((640, 480), "JPEG")], return_tensors="np")["pixel_values"]
+    assert batch.shape == (2, 3, 224, 224)
+    single = processor(images=photo(), return_tensors="np")["pixel_values"]
+    assert single.shape == (1, 3, 224, 224)
+    assert np.shares_memory(batch, single)
@@ -0,0 +1,60 @@
+import pytest
+
+import local_retrieval
+from local_retrieval import LocalRetriever, bm25_scores, build_index, chunk_text
+
+
+DOCUMENTS = {
+    "paddy.txt": "Mundakan is the second paddy season in Kerala, sown in September.",
+    "banana.txt": "Banana needs potassium rich fertilizer every two months.",
+    "pepper.txt": "Quick wilt of pepper spreads in waterlogged soil during the monsoon.",
+}
+
+
+@pytest.fixture
+def documents_dir(tmp_path):
+    folder = tmp_path / "docs"
+    folder.mkdir()
+    for name, text in DOCUMENTS.items():
+        (folder / name).write_text(text, encoding="utf-8")
+    return folder
+
+
+def test_chunks_overlap():
+    words = [f"w{i}" for i in range(250)]
+    chunks = chunk_text(" ".join(words), chunk_words=100, overlap=20)
+    assert [c.split()[0] for c in chunks] == ["w0", "w80", "w160"]
+    assert chunks[-1].split()[-1] == "w249"
+
+
+def test_bm25_ranks_matching_document_first():
+    index = build_index(DOCUMENTS)
+    scores = bm25_scores(index, "When is the Mundakan paddy season?")
+    best = max(scores, key=scores.get)
+    assert index["chunks"][best]["source"] == "paddy.txt"
+    assert len(scores) == 1  # only chunks sharing a term are scored
+
+
+def test_index_is_rebuilt_only_when_documents_change(documents_dir, tmp_path):
+    index_path = str(tmp_path / "index.json")
+    first = LocalRetriever(str(documents_dir), index_path, embedding_model="")
+    assert LocalRetriever(str(documents_dir), index_path, embedding_model="").index == first.index
+
+    (documents_dir / "banana.txt").write_text("Banana suckers are planted before the monsoon.", encoding="utf-8")
+    rebuilt = LocalRetriever(str(documents_dir), index_path, embedding_model="")
+    assert rebuilt.index["fingerprint"] != first.index["fingerprint"]
+    assert rebuilt.search("banana suckers", n_results=1)[0]["source"] == "banana.txt"
+
+
+def test_reciprocal_rank_fusion_combines_rankings(documents_dir, tmp_path, monkeypatch):
+    retriever = LocalRetriever(str(documents_dir), str(tmp_path / "index.json"), embedding_model="")
+    sources = [chunk["source"] for chunk in retriever.index["chunks"]]
+    banana, paddy, pepper = (sources.index(name) for name in ("banana.txt", "paddy.txt", "pepper.txt"))
+
+    # BM25 only matches pepper; the dense ranking puts paddy first and pepper second.
+    monkeypatch.setattr(retriever, "_dense_ranking", lambda query: [paddy, pepper, banana])
+    hits = retriever.search("pepper wilt", n_results=3)
+
+    assert [hit["source"] for hit in hits] == ["pepper.txt", "paddy.txt", "banana.txt"]
+    rrf = local_retrieval.RRF_K
+    assert hits[0]["score"] == pytest.approx(round(1 / (rrf + 1) + 1 / (rrf + 2), 5))
@@ -0,0 +1,40 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("dotenv")
+
+import mistral_chatbot
+
+
+def tool_call(name):
+    return SimpleNamespace(id=name, function=SimpleNamespace(name=name, arguments=json.dumps({"query": "q"})))
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(mistral_chatbot, "TOOL_FUNCTIONS", {
+        "slow": lambda query: release.wait(5) and "slow",
+        "fast": lambda query: f"fast {query}",
+    })
+    monkeypatch.setattr(mistral_chatbot, "TOOL_TIMEOUTS", {"slow": 0.1, "fast": 2})
+    yield
+    release.set()
+
+
+def test_slow_tool_times_out_without_holding_back_the_others(tools):
+    start = time.monotonic()
+    results = mistral_chatbot.run_tool_calls([tool_call("slow"), tool_call("fast")])
+
+    assert time.monotonic() - start < 1
+    assert results[0].startswith("(Tool slow timed out after 0.1s")
+    assert results[1] == "fast q"
+
+
+def test_unknown_tool_is_reported_not_raised(tools):
+    assert mistral_chatbot.run_tool_call(tool_call("missing")).startswith("(Error executing tool missing")
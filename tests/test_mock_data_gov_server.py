@@ -0,0 +1,56 @@
+import pytest
+
+from mock_data_gov_server import start_server
+
+pytest.importorskip("requests")
+pytest.importorskip("streamlit")
+
+
+@pytest.fixture
+def data_gov(monkeypatch):
+    server, base_url = start_server()
+    import marketbest
+    monkeypatch.setattr(marketbest, "BASE_URL", base_url)
+    monkeypatch.setenv("DATA_GOV_API_KEY", "test")
+    yield marketbest
+    server.shutdown()
+
+
+def test_fetch_records_applies_filters(data_gov):
+    records = data_gov.fetch_records({"state.keyword": "Kerala", "commodity": "Banana"}, limit=1000)
+    assert records
+    assert {r["state"] for r in records} == {"Kerala"}
+    assert {r["commodity"] for r in records} == {"Banana"}
+    assert all("modal_price" in r for r in records)
+
+
+def test_fetch_records_honours_limit(data_gov):
+    assert len(data_gov.fetch_records({"state.keyword": "Kerala"}, limit=3)) == 3
+
+
+def test_fetch_records_raises_on_upstream_error(monkeypatch):
+    import requests
+    import marketbest
+    server, base_url = start_server(error_rate=1.0)
+    try:
+        monkeypatch.setattr(marketbest, "BASE_URL", base_url)
+        monkeypatch.setenv("DATA_GOV_API_KEY", "test")
+        with pytest.raises(requests.HTTPError):
+            marketbest.fetch_records({"commodity": "Banana"}, limit=1)
+    finally:
+        server.shutdown()
+
+
+def test_state_prices_serve_stale_across_midnight(data_gov, tmp_path, monkeypatch):
+    import time
+    import api_cache
+    cache = api_cache.PersistentCache(str(tmp_path / "api_cache.sqlite3"))
+    monkeypatch.setattr(api_cache, "get_cache", lambda: cache)
+
+    first = data_gov.get_state_prices("Banana")
+    assert first
+    # An hour old, e.g. fetched just before midnight: past PRICE_TTL, within PRICE_STALE_TTL.
+    cache._conn().execute("UPDATE cache SET fetched_at = ?", (time.time() - 3600,))
+    monkeypatch.setattr(data_gov, "_fetch_state_prices", lambda crop, state: {})
+
+    assert data_gov.get_state_prices("Banana") == first
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("joblib")
+
+import model_registry
+
+
+def test_save_model_writes_atomically(tmp_path):
+    registry = str(tmp_path / "models")
+    filename = model_registry.save_model({"order": (1, 1, 1)}, "Amla(Nelli Kai)", "Kochi / APMC", registry)
+
+    assert os.listdir(registry) == [filename]
+    assert "/" not in filename and " " not in filename
+    model_registry.write_manifest({model_registry.series_key("Amla(Nelli Kai)", "Kochi / APMC"): {"file": filename}},
+                                  registry)
+    assert model_registry.load_model("Amla(Nelli Kai)", "Kochi / APMC", registry) == {"order": (1, 1, 1)}
+    assert not [name for name in os.listdir(registry) if name.endswith(".tmp")]
+
+
+def test_model_filenames_do_not_collide():
+    # Same slug, different keys.
+    assert model_registry.model_filename("Rice", "A/B") != model_registry.model_filename("Rice", "A B")
+
+
+def test_manifest_is_reread_only_when_it_changes(tmp_path, monkeypatch):
+    registry = str(tmp_path / "models")
+    model_registry.write_manifest({"Rice|Kochi": {"file": "a.joblib"}}, registry)
+    first = model_registry.load_manifest(registry)
+
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda *args, **kwargs: opened.append(args[0]) or real_open(*args, **kwargs))
+    assert model_registry.load_manifest(registry) is first
+    assert opened == []
+
+    model_registry.write_manifest({"Rice|Thrissur": {"file": "b.joblib"}}, registry)
+    later = time.time() + 5
+    os.utime(model_registry.manifest_path(registry), (later, later))
+    assert list(model_registry.load_manifest(registry)) == ["Rice|Thrissur"]
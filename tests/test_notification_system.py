@@ -0,0 +1,109 @@
+import time
+import threading
+
+import pytest
+
+import notification_system
+
+
+class CollectingSink:
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, user_id, channel, message):
+        with self._lock:
+            self.sent.append((user_id, channel, message))
+
+
+class CountingGenerator:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, location, crop):
+        with self._lock:
+            self.calls.append((location, crop))
+        time.sleep(self.delay)
+        return f"Tasks for {crop} in {location}"
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return notification_system.NotificationQueue(str(tmp_path / "notifications.sqlite3"))
+
+
+def test_rerun_does_not_send_twice(queue):
+    sink, generator = CollectingSink(), CountingGenerator()
+    for user in ("u1", "u2", "u3"):
+        queue.add_job(user, "Kochi", "banana", run_now=True)
+    notification_system.NotificationEngine(queue, sink, generator, workers=2).run(once=True)
+
+    # Make the same jobs due again on the same day, as after a restart.
+    for user in ("u1", "u2", "u3"):
+        queue.add_job(user, "Kochi", "banana", run_now=True)
+    engine = notification_system.NotificationEngine(queue, sink, generator, workers=2)
+    engine.run(once=True)
+
+    assert sorted(user for user, _, _ in sink.sent) == ["u1", "u2", "u3"]
+    assert engine.metrics()["duplicates"] == 3
+    assert engine.metrics()["delivered"] == 0
+    assert queue.latest_delivery("u1") == "Tasks for banana in Kochi"
+
+
+def test_same_location_and_crop_are_generated_once(queue):
+    sink, generator = CollectingSink(), CountingGenerator(delay=0.05)
+    for i in range(20):
+        queue.add_job(f"u{i}", "Kochi" if i % 2 else "Thrissur", "banana", run_now=True)
+    engine = notification_system.NotificationEngine(queue, sink, generator, workers=8)
+    engine.run(once=True)
+
+    metrics = engine.metrics()
+    assert sorted(generator.calls) == [("Kochi", "banana"), ("Thrissur", "banana")]
+    assert metrics["generated"] == 2
+    assert metrics["coalesced"] == 18
+    assert metrics["delivered"] == 20
+    assert len(sink.sent) == 20
+
+
+def test_failed_send_is_retried_not_deduplicated(queue):
+    class FlakySink(CollectingSink):
+        def send(self, user_id, channel, message):
+            if not self.sent and not getattr(self, "failed", False):
+                self.failed = True
+                raise RuntimeError("gateway down")
+            super().send(user_id, channel, message)
+
+    sink = FlakySink()
+    queue.add_job("u1", "Kochi", "banana", run_now=True)
+    engine = notification_system.NotificationEngine(queue, sink, CountingGenerator(), workers=1)
+    engine.run(once=True)
+    assert engine.metrics()["failed"] == 1
+
+    queue.add_job("u1", "Kochi", "banana", run_now=True)
+    engine.run(once=True)
+    assert sink.sent == [("u1", "push", "Tasks for banana in Kochi")]
+
+
+def test_token_bucket_allows_burst_then_limits_rate():
+    bucket = notification_system.TokenBucket(rate=50.0, burst=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05
+
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # Five more tokens at 50/s need about 0.1s of refill.
+    assert time.monotonic() - started >= 0.08
+
+
+def test_channels_are_rate_limited_independently(queue, monkeypatch):
+    monkeypatch.setitem(notification_system.CHANNEL_RATE_LIMITS, "sms", 20.0)
+    monkeypatch.setitem(notification_system.CHANNEL_RATE_LIMITS, "push", 1000.0)
+    engine = notification_system.NotificationEngine(queue, CollectingSink(), CountingGenerator(), workers=4)
+    sms, push = engine._bucket("sms"), engine._bucket("push")
+    assert sms is not push
+    assert (sms.rate, push.rate) == (20.0, 1000.0)
@@ -0,0 +1,90 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import price_store
+import price_aggregates
+
+COLUMNS = ["State", "District", "Market", "Commodity", "Variety", "Grade", "Arrival_Date",
+           "Min_Price", "Max_Price", "Modal_Price"]
+
+
+def export(rows, path):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return str(path)
+
+
+def random_rows(days=90, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for state in ("Kerala", "Tamil Nadu"):
+        for commodity in ("Banana", "Amla(Nelli Kai)"):
+            for market in ("Kochi", "Thrissur"):
+                for day in pd.date_range("2025-01-01", periods=days, freq="D"):
+                    if rng.random() < 0.6:
+                        for variety in ("A", "B"):
+                            price = round(2000 + rng.normal(0, 100), 1)
+                            rows.append([state, "Ernakulam", market, commodity, variety, "FAQ",
+                                         f"{day:%d/%m/%Y}", price - 50, price + 50, price])
+    return rows
+
+
+def comparable(df):
+    df = df.copy()
+    for col in ("State", "Commodity", "Market", "District"):
+        df[col] = df[col].astype(str)
+    df["Arrival_Date"] = pd.to_datetime(df["Arrival_Date"]).astype("datetime64[ns]")
+    return df.sort_values(["State", "Commodity", "Market", "Arrival_Date"]).reset_index(drop=True)
+
+
+def test_append_refreshes_only_recent_days_but_matches_a_rebuild(tmp_path):
+    rows = random_rows()
+    split = sum(1 for r in rows if pd.to_datetime(r[6], format="%d/%m/%Y") < pd.Timestamp("2025-03-10"))
+    store, aggregates = str(tmp_path / "store"), str(tmp_path / "aggregates")
+    price_store.ingest(export(rows[:split], tmp_path / "old.csv"), store_path=store, aggregates_path=aggregates)
+    price_store.append(export(rows[split:], tmp_path / "new.csv"), store_path=store, aggregates_path=aggregates)
+    incremental = comparable(price_aggregates.load_aggregates(aggregates_path=aggregates))
+
+    rebuilt_path = str(tmp_path / "rebuilt")
+    price_aggregates.rebuild(store, rebuilt_path)
+    rebuilt = comparable(price_aggregates.load_aggregates(aggregates_path=rebuilt_path))
+
+    pd.testing.assert_frame_equal(incremental[rebuilt.columns], rebuilt, check_dtype=False)
+
+
+def test_rolling_windows_stay_within_a_market():
+    history = pd.DataFrame({
+        "State": "Kerala", "Commodity": "Banana", "District": "Ernakulam",
+        "Market": ["Kochi", "Kochi", "Thrissur"],
+        "Arrival_Date": pd.to_datetime(["2025-01-01", "2025-01-20", "2025-01-21"]),
+        "Modal_Price": [100.0, 200.0, 1000.0],
+    })
+    result = price_aggregates.compute_aggregates(history).set_index("Market")
+    assert result.loc["Thrissur", "Mean_30d"] == 1000.0
+    assert result.loc["Thrissur", "Observations_30d"] == 1
+    kochi = result.loc["Kochi"].set_index("Arrival_Date")
+    assert kochi.loc["2025-01-20", "Mean_30d"] == 150.0
+    assert kochi.loc["2025-01-20", "Mean_7d"] == 200.0
+
+
+def test_aggregates_follow_a_custom_store(tmp_path):
+    store = str(tmp_path / "store")
+    price_store.ingest(export(random_rows(days=5), tmp_path / "prices.csv"), store_path=store)
+    assert price_aggregates.aggregates_exist(str(tmp_path / "store_aggregates"))
+
+
+def test_best_markets_drops_markets_without_recent_arrivals(tmp_path):
+    rows = [
+        ["Kerala", "Ernakulam", "Kochi", "Banana", "A", "FAQ", "01/01/2025", 4900, 5100, 5000],
+        ["Kerala", "Thrissur", "Thrissur", "Banana", "A", "FAQ", "20/02/2025", 2900, 3100, 3000],
+        ["Kerala", "Palakkad", "Palakkad", "Banana", "A", "FAQ", "01/03/2025", 1900, 2100, 2000],
+    ]
+    store, aggregates = str(tmp_path / "store"), str(tmp_path / "aggregates")
+    price_store.ingest(export(rows, tmp_path / "prices.csv"), store_path=store, aggregates_path=aggregates)
+
+    ranking = price_aggregates.best_markets("Banana", max_age_days=30, aggregates_path=aggregates)
+    assert ranking.index.tolist() == ["Thrissur", "Palakkad"]
+    everything = price_aggregates.best_markets("Banana", aggregates_path=aggregates)
+    assert everything.index.tolist() == ["Kochi", "Thrissur", "Palakkad"]
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import price_store
+
+COLUMNS = ["State", "District", "Market", "Commodity", "Variety", "Grade", "Arrival_Date",
+           "Min_Price", "Max_Price", "Modal_Price"]
+
+
+def export(rows, path):
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return str(path)
+
+
+def row(state, commodity, market, date, price):
+    return [state, "Ernakulam", market, commodity, "Local", "FAQ", date, price - 100, price + 100, price]
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "store")
+    price_store.ingest(export([
+        row("Kerala", "Banana", "Kochi", "01/03/2025", 2000),
+        row("Kerala", "Banana", "Kochi", "02/03/2025", 2100),
+        row("Kerala", "Coconut", "Kochi", "01/03/2025", 3000),
+        row("Tamil Nadu", "Banana", "Madurai", "01/03/2025", 1800),
+    ], tmp_path / "initial.csv"), store_path=path, aggregates_path=str(tmp_path / "aggregates"))
+    return path
+
+
+def append(tmp_path, store, rows):
+    return price_store.append(export(rows, tmp_path / "update.csv"), store_path=store,
+                              aggregates_path=str(tmp_path / "aggregates"))
+
+
+def test_append_keeps_the_new_row_on_duplicates(tmp_path, store):
+    append(tmp_path, store, [
+        row("Kerala", "Banana", "Kochi", "02/03/2025", 2500),
+        row("Kerala", "Banana", "Kochi", "03/03/2025", 2200),
+    ])
+    kochi = price_store.load_slice("Kerala", "Banana", "Kochi", store_path=store).loc["Kochi", "Modal_Price"]
+    assert kochi.tolist() == [2000, 2500, 2200]
+
+
+def test_append_leaves_untouched_partitions_alone(tmp_path, store):
+    coconut = price_store.partition_dir("Kerala", "Coconut", store)
+    before = {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(coconut)}
+    append(tmp_path, store, [row("Kerala", "Banana", "Kochi", "03/03/2025", 2200)])
+
+    after = {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(coconut)}
+    assert after == before
+    assert len(price_store.load_slice("Tamil Nadu", "Banana", store_path=store)) == 1
+
+
+def test_ingest_replaces_only_the_partitions_in_the_export(tmp_path, store):
+    price_store.ingest(export([row("Kerala", "Banana", "Thrissur", "05/03/2025", 1900)], tmp_path / "redo.csv"),
+                       store_path=store, aggregates_path=str(tmp_path / "aggregates"))
+    banana = price_store.load_slice("Kerala", "Banana", store_path=store)
+    assert banana.index.get_level_values("Market").unique().tolist() == ["Thrissur"]
+    assert len(price_store.load_slice("Kerala", "Coconut", store_path=store)) == 1
+
+
+def test_partitions_with_spaces_round_trip(store):
+    partitions = price_store.list_partitions(store)
+    assert ("Tamil Nadu", "Banana") in set(partitions.itertuples(index=False))
+    loaded = price_store.load_partitions([("Tamil Nadu", "Banana"), ("Kerala", "Coconut")], store_path=store)
+    assert sorted(loaded["State"].astype(str).unique()) == ["Kerala", "Tamil Nadu"]
+    assert len(loaded) == 2
@@ -0,0 +1,59 @@
+import io
+import itertools
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+import result_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing timestamps, so last_used orders every access.
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(result_cache.time, "time", lambda: float(next(ticks)))
+
+
+def leaf(size=(256, 256), fmt="PNG", quality=95):
+    image = Image.new("RGB", (64, 64))
+    image.putdata([(x * 4, y * 4, (x * y) % 256) for y in range(64) for x in range(64)])
+    image = image.resize(size, Image.BILINEAR)
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, **({"quality": quality} if fmt == "JPEG" else {}))
+    return buf.getvalue()
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = result_cache.ResultCache(str(tmp_path / "results.sqlite3"), max_entries=2)
+    cache.put("a", {"label": "rust"})
+    cache.put("b", {"label": "blight"})
+    assert cache.get("a") == {"label": "rust"}  # "b" is now the oldest
+
+    cache.put("c", {"label": "healthy"})
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == {"label": "rust"}
+
+
+def test_reencoded_photo_hits_by_perceptual_hash(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / "results.sqlite3"), phash_max_distance=6)
+    original, copy = leaf(), leaf(size=(200, 200), fmt="JPEG", quality=70)
+    assert result_cache.content_hash(original, "onnx") != result_cache.content_hash(copy, "onnx")
+
+    phash = result_cache.perceptual_hash(Image.open(io.BytesIO(original)))
+    cache.put(result_cache.content_hash(original, "onnx"), {"label": "rust"}, phash=phash)
+
+    similar = result_cache.perceptual_hash(Image.open(io.BytesIO(copy)))
+    assert result_cache.hamming_distance(phash, similar) <= 6
+    assert cache.get_similar(similar, namespace="onnx") == {"label": "rust"}
+    # Other runtimes' results are never served.
+    assert cache.get_similar(similar, namespace="torch") is None
+
+
+def test_near_duplicate_lookup_is_off_by_default(tmp_path):
+    cache = result_cache.ResultCache(str(tmp_path / "results.sqlite3"), phash_max_distance=0)
+    phash = result_cache.perceptual_hash(Image.open(io.BytesIO(leaf())))
+    cache.put(result_cache.content_hash(leaf(), "onnx"), {"label": "rust"}, phash=phash)
+    assert cache.get_similar(phash, namespace="onnx") is None
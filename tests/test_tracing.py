@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture
+def trace_path(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_PATH", str(path))
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    return path
+
+
+def read(path):
+    tracing.flush()
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_disabled_without_trace_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_PATH", "")
+    with tracing.span("outer") as attrs:
+        attrs["hit"] = True
+    tracing.flush()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_children_record_their_parent(trace_path):
+    with tracing.span("outer"):
+        with tracing.span("inner", n=1):
+            pass
+    inner, outer = read(trace_path)
+    assert inner["parent_id"] == outer["span_id"]
+    assert inner["trace_id"] == outer["trace_id"]
+    assert inner["attributes"] == {"n": 1}
+
+
+def test_unsampled_trace_drops_every_span(trace_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+    with tracing.span("outer"):
+        with tracing.span("inner"):
+            pass
+    tracing.flush()
+    assert not trace_path.exists()
+
+
+def test_rotates_past_max_bytes(trace_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_MAX_BYTES", 1)
+    with tracing.span("first"):
+        pass
+    tracing.flush()
+    with tracing.span("second"):
+        pass
+    assert [r["name"] for r in read(trace_path)] == ["second"]
+    backup = trace_path.with_name(trace_path.name + ".1")
+    assert json.loads(backup.read_text(encoding="utf-8"))["name"] == "first"
+
+
+def test_fingerprint_hides_text():
+    assert tracing.fingerprint("my farm in Kochi") == tracing.fingerprint("my farm in Kochi")
+    assert "Kochi" not in tracing.fingerprint("my farm in Kochi")
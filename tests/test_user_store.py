@@ -0,0 +1,45 @@
+import hashlib
+import pickle
+
+from user_store import UserStore
+
+
+def sha256(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def test_empty_store_starts_with_the_admin_account(tmp_path):
+    store = UserStore(str(tmp_path / "users.sqlite3"), legacy_file=str(tmp_path / "missing.pkl"))
+    assert store.count() == 1
+    assert store.check_password("admin", sha256("admin123"))
+
+
+def test_admin_is_not_added_to_a_store_with_users(tmp_path):
+    path = str(tmp_path / "users.sqlite3")
+    store = UserStore(path, legacy_file=str(tmp_path / "missing.pkl"))
+    assert store.create_user("ravi", sha256("pw"))
+    store._conn().execute("DELETE FROM users WHERE username = 'admin'")
+
+    assert not UserStore(path, legacy_file=str(tmp_path / "missing.pkl")).exists("admin")
+
+
+def test_pickle_users_are_migrated_once(tmp_path):
+    legacy = tmp_path / "users.pkl"
+    legacy.write_bytes(pickle.dumps({"ravi": sha256("pw"), "admin": sha256("changed")}))
+    path = str(tmp_path / "users.sqlite3")
+
+    store = UserStore(path, legacy_file=str(legacy))
+    assert store.count() == 2
+    assert store.check_password("ravi", sha256("pw"))
+    assert store.check_password("admin", sha256("changed"))
+
+    # A user deleted after the migration stays deleted when the pickle is still around.
+    store._conn().execute("DELETE FROM users WHERE username = 'ravi'")
+    assert not UserStore(path, legacy_file=str(legacy)).exists("ravi")
+
+
+def test_duplicate_signup_is_rejected(tmp_path):
+    store = UserStore(str(tmp_path / "users.sqlite3"), legacy_file=str(tmp_path / "missing.pkl"))
+    assert store.create_user("ravi", sha256("pw"))
+    assert not store.create_user("ravi", sha256("other"))
+    assert store.check_password("ravi", sha256("pw"))
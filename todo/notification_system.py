@@ -1,8 +1,346 @@
+"""
+Scheduled notification engine for the daily smart to-do lists.
+
+- Per-user jobs live in a persistent SQLite queue (notifications.sqlite3).
+- A worker pool claims due jobs with a lease, so several engine processes
+  can share one queue without sending twice.
+- Users with the same (location, crop) share one generated to-do list per
+  day; concurrent requests for it are coalesced into a single generation.
+- A (user, channel, day, content) delivery log drops duplicate sends.
+- Each channel has its own token-bucket rate limit.
+- Delivery goes to a pluggable sink: stdout or a JSONL file for local runs.
+
+    python notification_system.py add --user farmer42 --location Kochi --crop banana --at 06:00
+    python notification_system.py run --workers 8 --sink file:outbox.jsonl --once
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+QUEUE_PATH = os.getenv("NOTIFICATION_QUEUE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "notifications.sqlite3"))
+JOB_LEASE = 300  # seconds a claimed job stays invisible to other workers
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60
+# Deliveries per second allowed on each channel
+CHANNEL_RATE_LIMITS = {"push": 50.0, "sms": 5.0, "email": 20.0}
+DEFAULT_RATE_LIMIT = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    user_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    location TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    send_at TEXT NOT NULL,
+    next_run_at REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, channel)
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (next_run_at);
+CREATE TABLE IF NOT EXISTS deliveries (
+    user_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    day TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    message TEXT NOT NULL,
+    delivered_at REAL NOT NULL,
+    PRIMARY KEY (user_id, channel, day, content_hash)
+);
+"""
+
+def check_for_notifications(user_id=None) -> str:
+    """
+    Returns the header followed by the latest delivered to-do list for the
+    user, or just the header if nothing has been delivered yet.
+    """
+    header = "☀️ Here are your key tasks based on the current date:"
+    if user_id is None or not os.path.exists(QUEUE_PATH):
+        return header
+    row = NotificationQueue().latest_delivery(user_id)
+    return f"{header}\n{row}" if row else header
+
+def next_run(send_at, after=None):
+    """
+    Next local time (epoch seconds) at the daily HH:MM `send_at`, strictly after `after`.
+    """
+    after = after or time.time()
+    hour, minute = (int(part) for part in send_at.split(":"))
+    now = datetime.datetime.fromtimestamp(after)
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate.timestamp() <= after:
+        candidate += datetime.timedelta(days=1)
+    return candidate.timestamp()
+
+# --- Persistent Queue ---
+class NotificationQueue:
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add_job(self, user_id, location, crop, send_at="06:00", channel="push", run_now=False):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (user_id, channel, location, crop, send_at, next_run_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, channel, location, crop, send_at, time.time() if run_now else next_run(send_at)),
+        )
+
+    def remove_job(self, user_id, channel="push"):
+        self._conn().execute("DELETE FROM jobs WHERE user_id = ? AND channel = ?", (user_id, channel))
+
+    def claim_due(self, limit):
+        """
+        Atomically leases up to `limit` due jobs and returns them as dicts.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT user_id, channel, location, crop, send_at, attempts FROM jobs "
+                "WHERE next_run_at <= ? AND lease_until < ? ORDER BY next_run_at LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE user_id = ? AND channel = ?",
+                [(now + JOB_LEASE, r[0], r[1]) for r in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        keys = ("user_id", "channel", "location", "crop", "send_at", "attempts")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def complete(self, job):
+        self._conn().execute(
+            "UPDATE jobs SET next_run_at = ?, lease_until = 0, attempts = 0 WHERE user_id = ? AND channel = ?",
+            (next_run(job["send_at"]), job["user_id"], job["channel"]),
+        )
+
+    def retry_later(self, job):
+        # After MAX_ATTEMPTS the job waits for its next daily slot instead.
+        attempts = job["attempts"] + 1
+        run_at = time.time() + RETRY_DELAY * attempts if attempts < MAX_ATTEMPTS else next_run(job["send_at"])
+        self._conn().execute(
+            "UPDATE jobs SET next_run_at = ?, lease_until = 0, attempts = ? WHERE user_id = ? AND channel = ?",
+            (run_at, attempts if attempts < MAX_ATTEMPTS else 0, job["user_id"], job["channel"]),
+        )
+
+    def record_delivery(self, user_id, channel, day, message):
+        """
+        Returns False if this exact content was already delivered to this user today.
+        """
+        content_hash = hashlib.sha256(message.encode("utf-8")).hexdigest()
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO deliveries (user_id, channel, day, content_hash, message, delivered_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, channel, day, content_hash, message, time.time()),
+        )
+        return cur.rowcount == 1
+
+    def forget_delivery(self, user_id, channel, day, message):
+        content_hash = hashlib.sha256(message.encode("utf-8")).hexdigest()
+        self._conn().execute(
+            "DELETE FROM deliveries WHERE user_id = ? AND channel = ? AND day = ? AND content_hash = ?",
+            (user_id, channel, day, content_hash),
+        )
+
+    def latest_delivery(self, user_id):
+        row = self._conn().execute(
+            "SELECT message FROM deliveries WHERE user_id = ? ORDER BY delivered_at DESC LIMIT 1", (user_id,)
+        ).fetchone()
+        return row[0] if row else None
 
-def check_for_notifications() -> str:
+# --- Delivery Sinks ---
+class StdoutSink:
+    def send(self, user_id, channel, message):
+        print(f"[{channel} -> {user_id}] {message}")
+
+class FileSink:
+    """
+    Appends one JSON line per delivery; a stand-in for real push/SMS gateways.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, user_id, channel, message):
+        line = json.dumps({"user_id": user_id, "channel": channel, "message": message, "sent_at": time.time()},
+                          ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def make_sink(spec):
     """
-    Simulates a notification that is always active.
-    Returns a notification message every time it's called.
+    "stdout" or "file:<path>".
     """
-    return "☀️ Here are your key tasks based on the current date:"
\ No newline at end of file
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    return StdoutSink()
+
+# --- Rate Limiting ---
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# --- Engine ---
+def default_generator(location, crop):
+    from todo_chatbot import get_daily_todo_list
+    return get_daily_todo_list(location, crop)
+
+class NotificationEngine:
+    def __init__(self, queue=None, sink=None, generator=default_generator, workers=8):
+        self.queue = queue or NotificationQueue()
+        self.sink = sink or StdoutSink()
+        self.generator = generator
+        self.workers = workers
+        self._buckets = {}
+        self._content = {}  # (location, crop, day) -> Future with the generated text
+        self._lock = threading.Lock()
+        self._metrics = {"jobs": 0, "delivered": 0, "duplicates": 0, "failed": 0,
+                         "generated": 0, "coalesced": 0}
+        self._started = time.monotonic()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _bucket(self, channel):
+        with self._lock:
+            if channel not in self._buckets:
+                self._buckets[channel] = TokenBucket(CHANNEL_RATE_LIMITS.get(channel, DEFAULT_RATE_LIMIT))
+            return self._buckets[channel]
+
+    def content_for(self, location, crop, day):
+        """
+        Generates the to-do list for a (location, crop, day) once; concurrent
+        and later requests for the same key reuse that result.
+        """
+        key = (location, crop, day)
+        with self._lock:
+            future = self._content.get(key)
+            owner = future is None
+            if owner:
+                future = self._content[key] = Future()
+        if not owner:
+            self._count("coalesced")
+            return future.result()
+        try:
+            text = self.generator(location, crop)
+            future.set_result(text)
+            self._count("generated")
+            return text
+        except Exception as e:
+            with self._lock:
+                self._content.pop(key, None)  # let a later job retry the generation
+            future.set_exception(e)
+            raise
+
+    def process(self, job):
+        self._count("jobs")
+        day = datetime.date.today().isoformat()
+        try:
+            message = self.content_for(job["location"], job["crop"], day)
+            if self.queue.record_delivery(job["user_id"], job["channel"], day, message):
+                self._bucket(job["channel"]).acquire()
+                try:
+                    self.sink.send(job["user_id"], job["channel"], message)
+                except Exception:
+                    self.queue.forget_delivery(job["user_id"], job["channel"], day, message)
+                    raise
+                self._count("delivered")
+            else:
+                self._count("duplicates")
+            self.queue.complete(job)
+        except Exception as e:
+            self._count("failed")
+            print(f"!!! Notification for {job['user_id']} failed: {e}")
+            self.queue.retry_later(job)
+
+    def run(self, once=False, poll_interval=5.0):
+        """
+        Claims due jobs and processes them on the worker pool. With once=True
+        it stops as soon as no job is due.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                jobs = self.queue.claim_due(limit=self.workers * 4)
+                if not jobs:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                list(pool.map(self.process, jobs))
+                # Drop yesterday's cached content keys
+                today = datetime.date.today().isoformat()
+                with self._lock:
+                    for key in [k for k in self._content if k[2] != today]:
+                        del self._content[key]
+
+    def metrics(self):
+        with self._lock:
+            snapshot = dict(self._metrics)
+        elapsed = time.monotonic() - self._started
+        snapshot["elapsed_s"] = round(elapsed, 2)
+        snapshot["delivered_per_s"] = round(snapshot["delivered"] / elapsed, 2) if elapsed else 0.0
+        return snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily to-do notification engine.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Schedule a daily notification for a user")
+    add.add_argument("--user", required=True)
+    add.add_argument("--location", default="Thiruvananthapuram")
+    add.add_argument("--crop", default="coconut")
+    add.add_argument("--at", default="06:00", help="Local send time, HH:MM")
+    add.add_argument("--channel", default="push")
+    add.add_argument("--now", action="store_true", help="Make the first run due immediately")
+
+    run = sub.add_parser("run", help="Run the worker pool")
+    run.add_argument("--workers", type=int, default=8)
+    run.add_argument("--sink", default="stdout", help='"stdout" or "file:<path>"')
+    run.add_argument("--once", action="store_true", help="Exit when no job is due")
+
+    args = parser.parse_args()
+    if args.command == "add":
+        NotificationQueue().add_job(args.user, args.location, args.crop, args.at, args.channel, run_now=args.now)
+        print(f"Scheduled {args.channel} notification for {args.user} at {args.at}")
+    else:
+        engine = NotificationEngine(sink=make_sink(args.sink), workers=args.workers)
+        try:
+            engine.run(once=args.once)
+        finally:
+            print(json.dumps(engine.metrics()))
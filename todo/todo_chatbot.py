@@ -1,75 +1,173 @@
 import os
+import sys
+import csv
+import json
+import argparse
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from mistralai.client import MistralClient
 from dotenv import load_dotenv
 
 # Import our knowledge base and NEW weather tool
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages"))
 from unified_tools import query_knowledge_base, get_weather, google_search
+import tracing
+
+MODEL = "mistral-small-latest"
+DEFAULT_LOCATION = "Thiruvananthapuram"
+DEFAULT_CROP = "coconut"
+MAX_FETCH_CONCURRENCY = 16   # source fetches in flight during a batch
+MAX_LLM_CONCURRENCY = 8      # Mistral synthesis calls in flight during a batch
 
 # --- 1. SETUP ---
-print("DEBUG: Starting script setup...")
-load_dotenv()
-try:
-    mistral_api_key = os.getenv("MISTRAL_API_KEY")
-    if not mistral_api_key:
-        raise ValueError("MISTRAL_API_KEY is missing from .env")
-    
-    client = MistralClient(api_key=mistral_api_key)
-    model = "mistral-small-latest" 
-    print(f"DEBUG: Mistral client initialized successfully with model: {model}")
-
-except Exception as e:
-    print(f"!!! ERROR during setup: {e}")
-    exit()
-
-# --- 2. THE SMART TO-DO LIST FUNCTION ---
-def get_daily_todo_list() -> str:
-    print("DEBUG: Inside get_daily_todo_list function...")
-    current_month_name = datetime.date.today().strftime("%B")
-    
-    print("DEBUG: Step A1 - Gathering seasonal tasks from knowledge base...")
-    kb_query = f"Key farming tasks in Kerala during {current_month_name} for rice and coconut."
-    seasonal_tasks_info = query_knowledge_base(kb_query)
-    
-    print("DEBUG: Step A2 - Gathering live weather data...")
-    weather_info = get_weather(location="Thiruvananthapuram")
-    
-    print("DEBUG: Step A3 - Gathering live price data...")
-    price_info = google_search(query="current price of coconut in Thiruvananthapuram market")
-
-    print("DEBUG: Step B - Synthesizing final notification with Mistral AI...")
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> MistralClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            load_dotenv()
+            mistral_api_key = os.getenv("MISTRAL_API_KEY")
+            if not mistral_api_key:
+                raise ValueError("MISTRAL_API_KEY is missing from .env")
+            _client = MistralClient(api_key=mistral_api_key)
+        return _client
+
+# --- 2. GATHERING SOURCES ---
+def submit_sources(location, crop, month, executor):
+    """
+    Submits the seasonal tasks, live weather and live price fetches to
+    executor. Returns {name: future}.
+    """
+    kb_query = f"Key farming tasks in Kerala during {month} for rice and {crop}."
+    price_query = f"current price of {crop} in {location} market"
+    return {
+        "seasonal": executor.submit(tracing.propagate(query_knowledge_base), kb_query),
+        "weather": executor.submit(tracing.propagate(get_weather), location=location),
+        "price": executor.submit(tracing.propagate(google_search), query=price_query),
+    }
+
+def gather_sources(location, crop, month, executor=None):
+    """
+    Fetches the seasonal tasks, live weather and live price concurrently.
+    Returns a dict with the three results.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=3)
+    try:
+        with tracing.span("todo.gather_sources", location=location, crop=crop):
+            futures = submit_sources(location, crop, month, executor)
+            return {name: future.result() for name, future in futures.items()}
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False)
+
+# --- 3. SYNTHESIS ---
+def synthesize(sources) -> str:
     prompt = f"""
     You are an expert farm advisor... (prompt content is the same)
-    
+
     **Seasonal Focus Information:**
-    {seasonal_tasks_info}
+    {sources["seasonal"]}
 
     **Live Weather Data:**
-    {weather_info}
+    {sources["weather"]}
 
     **Live Market Price Data:**
-    {price_info}
+    {sources["price"]}
 
     Generate the compact notification now.
     """
-    
+
     messages = [{"role": "user", "content": prompt}]
-    chat_response = client.chat(model=model, messages=messages)
-    print("DEBUG: Synthesis successful.")
-    
+    with tracing.span("llm.chat", model=MODEL):
+        chat_response = get_client().chat(model=MODEL, messages=messages)
     return chat_response.choices[0].message.content
 
-# --- 3. MAIN SCRIPT ---
+# --- 4. THE SMART TO-DO LIST FUNCTION ---
+def get_daily_todo_list(location: str = DEFAULT_LOCATION, crop: str = DEFAULT_CROP) -> str:
+    current_month_name = datetime.date.today().strftime("%B")
+
+    with tracing.span("todo.daily", location=location, crop=crop):
+        sources = gather_sources(location, crop, current_month_name)
+        return synthesize(sources)
+
+def generate_batch(farmers, max_fetch_concurrency=MAX_FETCH_CONCURRENCY, max_llm_concurrency=MAX_LLM_CONCURRENCY):
+    """
+    Builds to-do lists for many farmers at once. `farmers` is a list of dicts
+    with farmer_id, location and crop.
+
+    Farmers sharing (location, crop, month) get the same sources and the same
+    prompt, so each distinct key is fetched once and synthesized once.
+    Every key's fetches are queued on the fetch pool up front, and a key's
+    synthesis goes to the LLM pool as soon as its last source arrives, so the
+    two bounds are independent: slow fetches never occupy an LLM slot.
+    Returns {farmer_id: to-do text or "(Error) ..."}.
+    """
+    month = datetime.date.today().strftime("%B")
+    keys = {}
+    for farmer in farmers:
+        key = (farmer.get("location") or DEFAULT_LOCATION, farmer.get("crop") or DEFAULT_CROP, month)
+        keys.setdefault(key, []).append(farmer["farmer_id"])
+
+    def build(source_futures):
+        try:
+            return synthesize({name: future.result() for name, future in source_futures.items()})
+        except Exception as e:
+            return f"(Error) {e}"
+
+    with tracing.span("todo.batch", farmers=len(farmers), distinct_keys=len(keys)), \
+            ThreadPoolExecutor(max_workers=max_fetch_concurrency) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=max_llm_concurrency) as llm_pool:
+        fetches = {key: submit_sources(*key, executor=fetch_pool) for key in keys}
+        owners = {future: key for key, source_futures in fetches.items() for future in source_futures.values()}
+        remaining = {key: len(source_futures) for key, source_futures in fetches.items()}
+        synthesis = {}
+        for future in as_completed(owners):
+            key = owners[future]
+            remaining[key] -= 1
+            if remaining[key] == 0:
+                synthesis[key] = llm_pool.submit(tracing.propagate(build), fetches[key])
+        results = {key: future.result() for key, future in synthesis.items()}
+
+    return {farmer_id: results[key] for key, farmer_ids in keys.items() for farmer_id in farmer_ids}
+
+# --- 5. MAIN SCRIPT ---
 def main():
-    print("DEBUG: Starting main function...")
+    parser = argparse.ArgumentParser(description="Generate smart daily to-do lists.")
+    parser.add_argument("--location", default=DEFAULT_LOCATION)
+    parser.add_argument("--crop", default=DEFAULT_CROP)
+    parser.add_argument("--batch", metavar="FARMERS_CSV", help="CSV with farmer_id,location,crop columns")
+    parser.add_argument("--output", default="todos.jsonl", help="Where batch results are written")
+    args = parser.parse_args()
+
+    try:
+        get_client()
+    except Exception as e:
+        print(f"!!! ERROR during setup: {e}")
+        exit()
+
+    if args.batch:
+        with open(args.batch, newline="", encoding="utf-8") as f:
+            farmers = list(csv.DictReader(f))
+        todos = generate_batch(farmers)
+        with open(args.output, "w", encoding="utf-8") as f:
+            for farmer_id, text in todos.items():
+                f.write(json.dumps({"farmer_id": farmer_id, "todo": text}, ensure_ascii=False) + "\n")
+        print(f"Wrote {len(todos)} to-do lists to {args.output}")
+        return
+
     print("\n--- Farmer's Smart Notification ---")
-    
-    daily_tasks = get_daily_todo_list()
-    
+
+    daily_tasks = get_daily_todo_list(args.location, args.crop)
+
     print("\n🔔 Here is your smart to-do list for today:")
     print("----------------------------------------")
     print(daily_tasks)
     print("----------------------------------------")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,28 +1,185 @@
 import pandas as pd
 import os
-import joblib
+import sys
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from statsmodels.tsa.arima.model import ARIMA
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages"))
+import price_store
+import model_registry
 
-# Load dataset
-df = pd.read_excel("commodity_price.xlsx")
-df.columns = df.columns.str.strip()
-df.rename(columns={'Arrival_Date': 'Date'}, inplace=True)
-# Rename commodity column
-if 'Commodi' in df.columns:
-    df.rename(columns={'Commodi': 'Commodity'}, inplace=True)
-
-# Rename Modal Price column
-if 'Modal_x0020_Price' in df.columns:
-    df.rename(columns={'Modal_x0020_Price': 'ModalPrice'}, inplace=True)
-
-# Rename your actual date column to 'Date'
-if 'Arrival_Date' in df.columns:
-    df.rename(columns={'Arrival_Date': 'Date'}, inplace=True)
-elif 'al_Date' in df.columns:
-    df.rename(columns={'al_Date': 'Date'}, inplace=True)
-elif 'Date_x0020' in df.columns:
-    df.rename(columns={'Date_x0020': 'Date'}, inplace=True)
-
-# Now convert to datetime
-df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+ARIMA_ORDER = (1, 1, 1)
+MIN_OBSERVATIONS = 10
+
+
+# --- Data Loading ---
+def load_prices():
+    """
+    Loads price data from the columnar store, ingesting the raw export on first run.
+    """
+    if not price_store.store_exists():
+        source = "commodity_price.xlsx" if os.path.exists("commodity_price.xlsx") else price_store.DEFAULT_SOURCE
+        price_store.ingest(source)
+    return price_store.load_all(columns=["State", "Commodity", "Modal_Price"]).reset_index()
+
+def to_daily_series(group):
+    """
+    Collapses one (Commodity, Market) group to a gap-free daily price series.
+    Days without arrivals carry the last known price forward.
+    """
+    series = group.groupby("Arrival_Date")["Modal_Price"].mean().sort_index()
+    return series.asfreq("D").ffill()
+
+def build_series(df):
+    """
+    Yields (commodity, market, state, daily_series) for every series long enough to fit.
+    """
+    grouped = df.groupby(["Commodity", "Market"], observed=True, sort=True)
+    for (commodity, market), group in grouped:
+        series = to_daily_series(group)
+        if len(series) >= MIN_OBSERVATIONS:
+            yield str(commodity), str(market), str(group["State"].iloc[0]), series
+
+# --- Model Fitting (runs in worker processes) ---
+def fit_series(task):
+    """
+    Fits one ARIMA model and writes it straight into the registry, so only
+    the small manifest entry travels back to the parent process.
+    """
+    commodity, market, state, series, order = task
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            results = ARIMA(series, order=order).fit()
+        filename = model_registry.save_model(results, commodity, market)
+    except Exception as e:
+        return model_registry.series_key(commodity, market), None, str(e)
+
+    entry = {
+        "commodity": commodity,
+        "market": market,
+        "state": state,
+        "file": filename,
+        "order": list(order),
+        "n_obs": int(len(series)),
+        "last_date": series.index[-1].strftime("%Y-%m-%d"),
+        "last_value": float(series.iloc[-1]),
+    }
+    return model_registry.series_key(commodity, market), entry, None
+
+def train_all(df, order=ARIMA_ORDER, workers=None):
+    """
+    Fits every (Commodity, Market) series across a process pool and writes the manifest.
+    """
+    tasks = [(c, m, s, series, order) for c, m, s, series in build_series(df)]
+    print(f"Fitting {len(tasks)} series with {workers or os.cpu_count()} workers...")
+
+    entries = {}
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        for key, entry, error in executor.map(fit_series, tasks, chunksize=chunksize):
+            if entry is None:
+                failures += 1
+                print(f"  ! {key}: {error}")
+            else:
+                entries[key] = entry
+
+    model_registry.write_manifest(entries)
+    print(f"Saved {len(entries)} models to {model_registry.REGISTRY_PATH} ({failures} failed).")
+    return entries
+
+# --- Incremental Update (runs in worker processes) ---
+def update_series(task):
+    """
+    Extends a fitted model with only the new days, keeping its parameters
+    (statsmodels `append(refit=False)` just runs the Kalman filter forward),
+    so the cost depends on the new rows rather than the full history.
+    """
+    key, entry, new_series = task
+    try:
+        results = model_registry.load_model(entry["commodity"], entry["market"])
+        # Fill any gap since the last training day with the last known price.
+        start = pd.Timestamp(entry["last_date"]) + pd.Timedelta(days=1)
+        daily = new_series.reindex(pd.date_range(start, new_series.index[-1], freq="D"))
+        if pd.isna(daily.iloc[0]):
+            daily.iloc[0] = entry["last_value"]
+        daily = daily.ffill()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            results = results.append(daily, refit=False)
+        model_registry.save_model(results, entry["commodity"], entry["market"])
+    except Exception as e:
+        return key, None, str(e)
+
+    entry = dict(entry)
+    entry["n_obs"] = int(entry["n_obs"] + len(daily))
+    entry["last_date"] = daily.index[-1].strftime("%Y-%m-%d")
+    entry["last_value"] = float(daily.iloc[-1])
+    return key, entry, None
+
+def update_incremental(source, order=ARIMA_ORDER, workers=None):
+    """
+    Merges a new export into the price store and updates only the series it
+    touches: existing models are extended with the new days, series that have
+    just become long enough are fitted from scratch, everything else is skipped.
+    Rows dated on or before a model's last training day are stored but not
+    replayed into the model.
+    """
+    new_rows = price_store.append(source).reset_index(drop=True)
+    entries = dict(model_registry.load_manifest())
+
+    update_tasks, fit_tasks = [], []
+    for (commodity, market), group in new_rows.groupby(["Commodity", "Market"], observed=True):
+        commodity, market = str(commodity), str(market)
+        key = model_registry.series_key(commodity, market)
+        entry = entries.get(key)
+        if entry is not None:
+            series = group.groupby("Arrival_Date")["Modal_Price"].mean().sort_index()
+            series = series[series.index > pd.Timestamp(entry["last_date"])]
+            if not series.empty:
+                update_tasks.append((key, entry, series))
+        else:
+            state = str(group["State"].iloc[0])
+            history = price_store.load_slice(state=state, commodity=commodity, market=market,
+                                             columns=["Modal_Price"]).reset_index()
+            series = to_daily_series(history)
+            if len(series) >= MIN_OBSERVATIONS:
+                fit_tasks.append((commodity, market, state, series, order))
+
+    print(f"Updating {len(update_tasks)} models and fitting {len(fit_tasks)} new series...")
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(update_series, update_tasks)) + list(executor.map(fit_series, fit_tasks))
+    for key, entry, error in outcomes:
+        if entry is None:
+            failures += 1
+            print(f"  ! {key}: {error}")
+        else:
+            entries[key] = entry
+
+    model_registry.write_manifest(entries)
+    print(f"Updated {len(outcomes) - failures} series ({failures} failed); "
+          f"{len(entries) - len(outcomes)} untouched.")
+    return entries
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Train per-series ARIMA price models.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--order", type=int, nargs=3, default=list(ARIMA_ORDER), metavar=("P", "D", "Q"))
+    parser.add_argument("--update", metavar="NEW_EXPORT",
+                        help="Only apply the new Arrival_Date rows in this export to the affected models")
+    args = parser.parse_args()
+
+    if args.update:
+        update_incremental(args.update, order=tuple(args.order), workers=args.workers)
+    else:
+        df = load_prices()
+        train_all(df, order=tuple(args.order), workers=args.workers)
+
+if __name__ == "__main__":
+    main()